@@ -0,0 +1,21 @@
+from django.urls import include, path, re_path
+
+from .async_views import (
+    ingredient_detail,
+    ingredient_list,
+    recipe_detail,
+    recipe_list,
+    tag_detail,
+    tag_list
+)
+
+
+urlpatterns = [
+    path('ingredients/', ingredient_list),
+    re_path(r'^ingredients/(?P<pk>\d+)/$', ingredient_detail),
+    path('recipes/', recipe_list),
+    re_path(r'^recipes/(?P<pk>\d+)/$', recipe_detail),
+    path('tags/', tag_list),
+    re_path(r'^tags/(?P<pk>\d+)/$', tag_detail),
+    path('', include('api.urls')),
+]
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .thread_contexts import thread_contexts
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+read_executor = ThreadPoolExecutor(
+    max_workers=settings.ASGI_READ_THREADS,
+    thread_name_prefix='api-read',
+)
+
+
+def run_read_view(view, request, *args, **kwargs):
+    """
+    Выполняет DRF-представление в потоке пула чтения.
+    Соединения потока закрываются по тем же правилам, что и в конце
+    обычного запроса, а ответ рендерится здесь же, а не в общем потоке.
+    """
+    close_old_connections()
+    try:
+        with thread_contexts(request):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def run_write_view(view, request, *args, **kwargs):
+    """Выполняет изменяющее представление в контекстах посредников."""
+    with thread_contexts(request):
+        return view(request, *args, **kwargs)
+
+
+def async_read_view(view):
+    """
+    Асинхронная обертка представления для ASGI.
+    Безопасные запросы выполняются параллельно в пуле потоков чтения,
+    поэтому один воркер одновременно ожидает ответов БД для многих запросов.
+    Остальные методы выполняются так же, как синхронные представления.
+    """
+    read_view = sync_to_async(
+        run_read_view,
+        thread_sensitive=False,
+        executor=read_executor
+    )
+    write_view = sync_to_async(run_write_view, thread_sensitive=True)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read_view(view, request, *args, **kwargs)
+        return await write_view(view, request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+recipe_list = async_read_view(
+    RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+)
+recipe_detail = async_read_view(
+    RecipeViewSet.as_view({
+        'get': 'retrieve',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    })
+)
+ingredient_list = async_read_view(
+    IngredientViewSet.as_view({'get': 'list'})
+)
+ingredient_detail = async_read_view(
+    IngredientViewSet.as_view({'get': 'retrieve'})
+)
+tag_list = async_read_view(TagViewSet.as_view({'get': 'list'}))
+tag_detail = async_read_view(TagViewSet.as_view({'get': 'retrieve'}))
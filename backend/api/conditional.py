@@ -0,0 +1,103 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
+from django.utils.http import quote_etag
+
+
+def get_etag(request, counted=(), latest=()):
+    """
+    Вычисляет ETag ответа без его сериализации.
+    Для запросов из counted берутся MAX(updated_at) и COUNT(*):
+    количество меняется при удалении записей, которое не двигает максимум.
+    Для запросов из latest берется только MAX(updated_at).
+    Для авторизованного пользователя учитывается версия его флагов
+    (избранное, список покупок, подписки).
+    Last-Modified не выдается: секундной точности HTTP-даты и одного
+    максимума мало, после удаления, отписки или двух правок за секунду
+    If-Modified-Since дал бы ложный 304.
+    """
+    state = []
+    for queryset in (*counted, *latest):
+        # MAX отдельно от COUNT берется по индексу на updated_at.
+        state.append(queryset.order_by().aggregate(
+            last_modified=Max('updated_at')
+        )['last_modified'])
+    for queryset in counted:
+        state.append(queryset.order_by().count())
+    user = request.user
+    if user.is_authenticated:
+        state.append((user.pk, user.flags_updated_at))
+    return hashlib.md5(repr(state).encode()).hexdigest()
+
+
+def conditional_response(request, etag, render):
+    """
+    Возвращает 304, если ETag совпал с If-None-Match запроса,
+    иначе вызывает render и добавляет к ответу ETag.
+    If-Modified-Since не учитывается.
+    """
+    response = get_conditional_response(request, etag=quote_etag(etag))
+    if response is None:
+        response = render()
+    if response.status_code in (200, 304):
+        response['ETag'] = quote_etag(etag)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы для list и retrieve вьюсета: при совпадении
+    If-None-Match возвращается 304 без выборки страницы и сериализации.
+    Вьюсет задает запросы-источники через get_counted_sources
+    и get_latest_sources по отфильтрованному запросу.
+    """
+
+    def get_counted_sources(self, queryset):
+        return (queryset,)
+
+    def get_latest_sources(self, queryset):
+        return ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = get_etag(
+            request,
+            self.get_counted_sources(queryset),
+            self.get_latest_sources(queryset)
+        )
+        return conditional_response(
+            request,
+            etag,
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+            etag = get_etag(
+                request,
+                self.get_counted_sources(queryset),
+                self.get_latest_sources(queryset)
+            )
+        except (TypeError, ValueError, ValidationError):
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(
+            request,
+            etag,
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
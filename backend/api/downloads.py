@@ -0,0 +1,45 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+
+
+def get_content_disposition(filename, as_attachment):
+    """Заголовок Content-Disposition в том же виде, что у FileResponse."""
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        return f'{disposition}; filename="{filename}"'
+    except UnicodeEncodeError:
+        return f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+def file_response(file, filename=None, as_attachment=False):
+    """
+    Ответ с файлом из MEDIA_ROOT, права на который уже проверены во вьюхе.
+    При FILE_ACCEL_REDIRECT_ENABLED Django отвечает только заголовками,
+    а файл отдает nginx из internal-локации FILE_ACCEL_REDIRECT_LOCATION
+    по X-Accel-Redirect: воркер освобождается сразу, nginx отдает файл
+    через sendfile. Без nginx (разработка) файл отдает FileResponse.
+    """
+    filename = filename or os.path.basename(file.name)
+    if not settings.FILE_ACCEL_REDIRECT_ENABLED:
+        return FileResponse(
+            file.open('rb'),
+            as_attachment=as_attachment,
+            filename=filename
+        )
+    content_type, _ = mimetypes.guess_type(filename)
+    response = HttpResponse(
+        content_type=content_type or 'application/octet-stream'
+    )
+    response['X-Accel-Redirect'] = (
+        settings.FILE_ACCEL_REDIRECT_LOCATION + quote(file.name)
+    )
+    response['Content-Disposition'] = get_content_disposition(
+        filename,
+        as_attachment
+    )
+    return response
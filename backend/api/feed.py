@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+
+from recipes.models import FeedEntry, Recipe, Subscriptions
+
+
+def get_pull_feed(user):
+    """
+    Рецепты авторов, на которых подписан пользователь, одним запросом:
+    author_id IN (SELECT following_id ...) по индексу (author, pub_date).
+    """
+    return Recipe.objects.filter(
+        author__in=Subscriptions.objects.filter(
+            follower=user
+        ).values('following')
+    )
+
+
+def get_timeline_feed(user):
+    """Записи ленты пользователя, заполненной при публикации рецептов."""
+    return FeedEntry.objects.filter(user=user)
+
+
+def fan_out_recipe(recipe_id):
+    """Добавляет опубликованный рецепт в ленты подписчиков автора."""
+    if not settings.FEED_FANOUT_ENABLED:
+        return
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'pk', 'author_id', 'pub_date'
+    ).first()
+    if recipe is None:
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=follower_id, recipe=recipe,
+                      pub_date=recipe.pub_date)
+            for follower_id in Subscriptions.objects.filter(
+                following_id=recipe.author_id
+            ).values_list('follower_id', flat=True).iterator()
+        ),
+        batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def add_author_to_feed(follower_id, following_id):
+    """Переносит рецепты автора в ленту нового подписчика."""
+    if not settings.FEED_FANOUT_ENABLED:
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=follower_id, recipe_id=recipe_id,
+                      pub_date=pub_date)
+            for recipe_id, pub_date in Recipe.objects.filter(
+                author_id=following_id
+            ).values_list('pk', 'pub_date').iterator()
+        ),
+        batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def remove_author_from_feed(follower_id, following_id):
+    """Убирает рецепты автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(
+        user_id=follower_id,
+        recipe__author_id=following_id
+    ).delete()
+
+
+def rebuild_feeds(user_ids):
+    """Пересобирает ленты пользователей по их подпискам."""
+    with transaction.atomic():
+        FeedEntry.objects.filter(user_id__in=user_ids).delete()
+        for follower_id, following_id in Subscriptions.objects.filter(
+            follower_id__in=user_ids
+        ).values_list('follower_id', 'following_id'):
+            add_author_to_feed(follower_id, following_id)
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+from rest_framework.serializers import ListSerializer
+
+from foodgram.constants import QUERY_PARAM_EXPAND, QUERY_PARAM_FIELDS
+
+
+def parse_field_list(value):
+    """Разбирает параметр вида "id,name,image" в множество имен."""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def get_fieldsets(request):
+    """
+    Запрошенные поля (?fields=) и раскрываемые связи (?expand=).
+    None означает, что параметр не передан: выводятся все поля
+    и раскрываются все связи.
+    """
+    if request is None:
+        return {'fields': None, 'expand': None}
+    return {
+        'fields': parse_field_list(
+            request.query_params.get(QUERY_PARAM_FIELDS)
+        ),
+        'expand': parse_field_list(
+            request.query_params.get(QUERY_PARAM_EXPAND)
+        ),
+    }
+
+
+def is_requested(context, name):
+    fields = context.get('fields')
+    return fields is None or name in fields
+
+
+def is_expanded(context, name):
+    expand = context.get('expand')
+    return is_requested(context, name) and (expand is None or name in expand)
+
+
+class SparseFieldsetsViewMixin:
+    """Передает сериализаторам вьюсета ?fields= и ?expand= из запроса."""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(get_fieldsets(self.request))
+        return context
+
+
+class SparseFieldsetsSerializerMixin:
+    """
+    Оставляет у сериализатора верхнего уровня только поля из ?fields=.
+    Вложенные сериализаторы выводятся целиком.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        if requested is None or parent is not None:
+            return fields
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if name in requested
+        )
@@ -1,7 +1,70 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import (
+    Count,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Subquery
+)
+from django.db.models.functions import Cast
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import SEARCH_CONFIG, Recipe, RecipeIngredient, Tag
+from .fuzzy import fuzzy_search
+from .user_flags import get_request_user_flags
+
+INGREDIENTS_MATCH_ALL = 'all'
+INGREDIENTS_MATCH_ANY = 'any'
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Фильтр по списку чисел, переданных через запятую."""
+
+
+def recipes_with_all_ingredients(ingredient_ids):
+    """
+    Подзапрос id рецептов, содержащих все ингредиенты.
+    Группируются только совпавшие строки RecipeIngredient,
+    которые читаются по индексу (ingredient, recipe).
+    """
+    return RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values('recipe_id').annotate(
+        matched=Count('ingredient_id')
+    ).filter(
+        matched=len(ingredient_ids)
+    ).values('recipe_id')
+
+
+def recipes_with_any_ingredient(ingredient_ids):
+    """Подзапрос id рецептов, содержащих хотя бы один из ингредиентов."""
+    return RecipeIngredient.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values('recipe_id')
+
+
+def count_recipe_ingredients(ingredient_ids=None):
+    """
+    Коррелированный подзапрос числа ингредиентов рецепта
+    (только из ingredient_ids, если они переданы),
+    выполняемый по индексу (recipe, ingredient).
+    """
+    recipe_ingredients = RecipeIngredient.objects.filter(
+        recipe_id=OuterRef('pk')
+    )
+    if ingredient_ids is not None:
+        recipe_ingredients = recipe_ingredients.filter(
+            ingredient_id__in=ingredient_ids
+        )
+    return Subquery(
+        recipe_ingredients.order_by().values('recipe_id').annotate(
+            count=Count('ingredient_id')
+        ).values('count'),
+        output_field=IntegerField(),
+    )
 
 
 class RecipeViewSetFilter(FilterSet):
@@ -11,12 +74,16 @@ class RecipeViewSetFilter(FilterSet):
     -Фильтрация по полю тегов проводится по его slug.
     -Фильтрация по полю избранного проводится по наличию флага присутствия.
     -Фильтрация по полю списка покупок проводится по наличию флага присутствия.
+    -Полнотекстовый поиск по названию и описанию с ранжированием.
+    -Фильтрация по id ингредиентов: все (ingredients_match=all) или любой.
+    -Подбор по имеющимся продуктам (pantry): рецепты сортируются по доле
+    своих ингредиентов, которая покрыта переданным набором.
+    -Нечеткий поиск по названию (name) с сортировкой по сходству.
     """
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited')
     author = filters.NumberFilter(
-        field_name='author__id',
-        lookup_expr='iexact',
+        field_name='author_id',
     )
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
@@ -25,6 +92,17 @@ class RecipeViewSetFilter(FilterSet):
         to_field_name='slug',
         queryset=Tag.objects.all(),
     )
+    search = filters.CharFilter(method='filter_search')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    ingredients_match = filters.ChoiceFilter(
+        choices=(
+            (INGREDIENTS_MATCH_ALL, INGREDIENTS_MATCH_ALL),
+            (INGREDIENTS_MATCH_ANY, INGREDIENTS_MATCH_ANY),
+        ),
+        method='filter_ingredients_match',
+    )
+    pantry = NumberInFilter(method='filter_pantry')
+    name = filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Recipe
@@ -32,20 +110,95 @@ class RecipeViewSetFilter(FilterSet):
             'tags',
             'author',
             'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart',
+            'search',
+            'ingredients',
+            'ingredients_match',
+            'pantry',
+            'name'
         )
 
     def filter_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
+            favorites = get_request_user_flags(self.request).favorites
+            if len(favorites) <= settings.USER_FLAGS_MAX_FILTER_IDS:
+                return queryset.filter(id__in=favorites)
             return queryset.filter(favorite_recipe__user=self.request.user)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
+            shopping_cart = get_request_user_flags(self.request).shopping_cart
+            if len(shopping_cart) <= settings.USER_FLAGS_MAX_FILTER_IDS:
+                return queryset.filter(id__in=shopping_cart)
             return queryset.filter(shoppingcart_recipe__user=self.request.user)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        """
+        Ищет по индексированному search_vector и ранжирует совпадения
+        (название важнее описания).
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        query = SearchQuery(
+            value,
+            config=SEARCH_CONFIG,
+            search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-pub_date')
+
+    def filter_ingredients(self, queryset, name, value):
+        ingredient_ids = set(value)
+        if not ingredient_ids:
+            return queryset
+        if (self.form.cleaned_data.get('ingredients_match')
+                == INGREDIENTS_MATCH_ANY):
+            return queryset.filter(
+                id__in=recipes_with_any_ingredient(ingredient_ids)
+            )
+        return queryset.filter(
+            id__in=recipes_with_all_ingredients(ingredient_ids)
+        )
+
+    def filter_ingredients_match(self, queryset, name, value):
+        return queryset
+
+    def filter_pantry(self, queryset, name, value):
+        ingredient_ids = set(value)
+        if not ingredient_ids:
+            return queryset
+        return queryset.filter(
+            id__in=recipes_with_any_ingredient(ingredient_ids)
+        ).annotate(
+            coverage=(
+                Cast(count_recipe_ingredients(ingredient_ids), FloatField())
+                / Cast(count_recipe_ingredients(), FloatField())
+            )
+        ).order_by('-coverage', '-pub_date')
+
+    def filter_name(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return fuzzy_search(queryset, 'name', value, limit=None)
+
 
 class IngredientViewSetFilter(SearchFilter):
-    """Кастомная модель фильтрации полей при выводе ингредиентов."""
+    """
+    Кастомная модель фильтрации полей при выводе ингредиентов.
+    По умолчанию ищет по началу названия, с параметром fuzzy
+    выполняет нечеткий поиск с сортировкой по сходству.
+    """
     search_param = 'name'
+    fuzzy_param = 'fuzzy'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        fuzzy = request.query_params.get(self.fuzzy_param, '').lower()
+        if term and fuzzy in ('1', 'true'):
+            return fuzzy_search(queryset, 'name', term)
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,163 @@
+import heapq
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.contrib.postgres.lookups import PostgresOperatorLookup
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import (
+    Case,
+    CharField,
+    Count,
+    FloatField,
+    Func,
+    IntegerField,
+    Max,
+    Value,
+    When
+)
+
+from foodgram.constants import FUZZY_SEARCH_LIMIT, FUZZY_SEARCH_THRESHOLD
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class TrigramWordSimilarity(Func):
+    """Функция word_similarity(строка, поле) из pg_trgm."""
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+    def __init__(self, string, expression, **extra):
+        if not hasattr(string, 'resolve_expression'):
+            string = Value(string)
+        super().__init__(string, expression, **extra)
+
+
+@CharField.register_lookup
+class TrigramWordSimilar(PostgresOperatorLookup):
+    """
+    Lookup поле %> строка: в поле есть слово, похожее на строку.
+    Оператор поддерживается GIN-индексом с gin_trgm_ops.
+    """
+    lookup_name = 'trigram_word_similar'
+    postgres_operator = '%%>'
+
+
+def get_trigrams(text):
+    """Триграммы слов строки как в pg_trgm: слово дополняется пробелами."""
+    trigrams = set()
+    for word in WORD_PATTERN.findall(text.lower()):
+        padded = f'  {word} '
+        trigrams.update(
+            padded[index:index + 3] for index in range(len(padded) - 2)
+        )
+    return trigrams
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс триграмм в памяти процесса.
+    Используется вместо pg_trgm на остальных БД, например SQLite в тестах.
+    Сходство считается как доля триграмм запроса, найденных в строке,
+    а при равенстве выше стоят строки, ближе совпадающие целиком.
+    version - состояние таблицы, по которому построен индекс.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.postings = defaultdict(list)
+        self.sizes = {}
+        for pk, text in rows:
+            trigrams = get_trigrams(text)
+            self.sizes[pk] = len(trigrams)
+            for trigram in trigrams:
+                self.postings[trigram].append(pk)
+
+    def search(self, term, threshold, limit=None):
+        """Совпадения от лучших, все при limit=None."""
+        query = get_trigrams(term)
+        if not query:
+            return []
+        matches = Counter()
+        for trigram in query:
+            matches.update(self.postings.get(trigram, ()))
+        scored = (
+            (
+                count / len(query),
+                count / (len(query) + self.sizes[pk] - count),
+                pk
+            )
+            for pk, count in matches.items()
+            if count / len(query) >= threshold
+        )
+        if limit is None:
+            return sorted(scored, reverse=True)
+        return heapq.nlargest(limit, scored)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index_version(model):
+    """
+    Версия таблицы для индекса: число строк и последнее изменение.
+    Видна всем процессам, поэтому изменение в одном процессе
+    перестраивает индексы и в остальных.
+    """
+    version = model.objects.order_by().aggregate(
+        count=Count('pk'),
+        updated_at=Max('updated_at')
+    )
+    return version['count'], version['updated_at']
+
+
+def get_trigram_index(model, field):
+    key = (model._meta.label, field)
+    version = get_index_version(model)
+    with _indexes_lock:
+        index = _indexes.get(key)
+    if index is None or index.version != version:
+        index = TrigramIndex(
+            model.objects.order_by().values_list('pk', field).iterator(),
+            version
+        )
+        with _indexes_lock:
+            _indexes[key] = index
+    return index
+
+
+def invalidate_trigram_index(model):
+    """Освобождает индексы модели в этом процессе до следующего поиска."""
+    with _indexes_lock:
+        for key in [key for key in _indexes if key[0] == model._meta.label]:
+            del _indexes[key]
+
+
+def fuzzy_search(queryset, field, term, limit=FUZZY_SEARCH_LIMIT):
+    """
+    Нечеткий поиск по полю с сортировкой по сходству.
+    На PostgreSQL используется оператор %> из pg_trgm по GIN-индексу,
+    иначе поиск идет по индексу триграмм в памяти.
+    Если limit равен None, срез не делается (например, при пагинации).
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        queryset = queryset.filter(
+            **{f'{field}__trigram_word_similar': term}
+        ).annotate(
+            word_similarity=TrigramWordSimilarity(term, field),
+            similarity=TrigramSimilarity(field, term),
+        ).order_by('-word_similarity', '-similarity', field)
+    else:
+        matches = get_trigram_index(queryset.model, field).search(
+            term, FUZZY_SEARCH_THRESHOLD, limit
+        )
+        ids = [pk for *_, pk in matches]
+        ranks = [When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ids)]
+        queryset = queryset.filter(pk__in=ids).annotate(
+            similarity_rank=Case(*ranks, output_field=IntegerField())
+        ).order_by('similarity_rank')
+    if limit is None:
+        return queryset
+    return queryset[:limit]
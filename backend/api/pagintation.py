@@ -1,4 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from urllib import parse
+
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
@@ -6,3 +16,118 @@ class CustomPagination(PageNumberPagination):
     Кастомный пагинатор с атрибутом для вывода количества страниц.
     """
     page_size_query_param = 'limit'
+
+
+class FeedPagination(BasePagination):
+    """
+    Пагинатор ленты по ключу (pub_date, id), от новых к старым.
+    Курсор хранит ключ последней записи страницы, следующая страница
+    выбирается сравнением строк WHERE (pub_date, id) < (%s, %s) по
+    индексу (author, -pub_date, -id), без OFFSET даже при совпадении
+    дат. Курсор назад хранит ключ первой записи и флаг направления.
+    Ответ в формате CursorPagination DRF: next, previous, results.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    # Поля ключа в порядке сортировки, оба по убыванию.
+    keys = ('pub_date', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, self.reverse = self.decode_cursor(request)
+        columns = [
+            '{}.{}'.format(
+                connection.ops.quote_name(queryset.model._meta.db_table),
+                connection.ops.quote_name(
+                    queryset.model._meta.get_field(key).column
+                )
+            )
+            for key in self.keys
+        ]
+        if position is not None:
+            queryset = queryset.extra(where=[
+                '({}) {} (%s, %s)'.format(
+                    ', '.join(columns), '>' if self.reverse else '<'
+                )
+            ], params=position)
+        ordering = self.keys if self.reverse else [
+            '-' + key for key in self.keys
+        ]
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        """Ключ записи и направление из ?cursor= или (None, False)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            tokens = parse.parse_qs(
+                b64decode(encoded.encode('ascii')).decode('ascii')
+            )
+            pub_date = parse_datetime(tokens['d'][0])
+            pk = int(tokens['i'][0])
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (pub_date, pk), reverse
+
+    def encode_cursor(self, instance, reverse):
+        tokens = {
+            'd': getattr(instance, self.keys[0]).isoformat(),
+            'i': getattr(instance, self.keys[1]),
+        }
+        if reverse:
+            tokens['r'] = 1
+        encoded = b64encode(
+            parse.urlencode(tokens).encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class TimelinePagination(FeedPagination):
+    """
+    Пагинатор ленты, заполненной при публикации рецептов,
+    по ключу (pub_date, recipe_id) и индексу (user, -pub_date, -recipe).
+    """
+    keys = ('pub_date', 'recipe_id')
@@ -0,0 +1,277 @@
+import asyncio
+import cProfile
+import io
+import marshal
+import math
+import pstats
+import time
+from contextlib import ExitStack, contextmanager
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import add_never_cache_headers
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import APIException
+
+from foodgram.constants import (
+    PROFILING_MAX_QUERIES,
+    PROFILING_RETRY_AFTER,
+    PROFILING_STATS_LIMIT,
+    QUERY_PARAM_PROFILE,
+    QUERY_PARAM_PROFILE_FORMAT
+)
+from .downloads import get_content_disposition
+from .thread_contexts import add_thread_context
+from .throttling import (
+    ConcurrencyLimiter,
+    ServiceBusy,
+    TokenBuckets,
+    parse_rate
+)
+
+PROFILE_CPROFILE = 'cprofile'
+PROFILE_SQL = 'sql'
+PROFILE_FORMAT_PROF = 'prof'
+PROFILE_FILENAME = 'profile.prof'
+
+
+class QueryLog:
+    """
+    Обертка выполнения запросов БД, записывающая SQL и время
+    в общий для всех подключений список queries.
+    """
+
+    def __init__(self, alias, queries):
+        self.alias = alias
+        self.queries = queries
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if not many:
+                sql = context['connection'].ops.last_executed_query(
+                    context['cursor'], sql, params
+                )
+            self.queries.append({
+                'alias': self.alias,
+                'time': round(duration * 1000, 3),
+                'sql': sql,
+            })
+
+
+@contextmanager
+def capture_queries(queries):
+    """QueryLog на всех подключениях текущего потока."""
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(
+                connections[alias].execute_wrapper(QueryLog(alias, queries))
+            )
+        yield
+
+
+@contextmanager
+def profiler_enabled(profiler):
+    """cProfile собирает вызовы только потока, в котором включен."""
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запроса по ?_profile= для персонала.
+    cprofile - запрос выполняется под cProfile, в ответе текст pstats
+    (самые долгие по cumulative) или файл .prof при ?_profile_format=prof;
+    sql - в ответе все запросы к БД со временем выполнения.
+    Вместо тела ответа возвращается профиль. Запросы без параметра
+    и запросы не от персонала проходят без изменений. Частота
+    профилирования ограничена PROFILING_RATE на пользователя,
+    одновременно в процессе выполняется PROFILING_CONCURRENCY профилей.
+    В асинхронной цепочке (ASGI) профилируется представление,
+    выполняемое в потоке через api.async_views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    buckets = TokenBuckets(settings.THROTTLE_BUCKETS_MAX_SIZE)
+    limiter = ConcurrencyLimiter(
+        settings.PROFILING_CONCURRENCY,
+        PROFILING_RETRY_AFTER
+    )
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        mode = self.get_mode(request)
+        user = self.get_staff_user(request) if mode else None
+        if user is None:
+            return self.get_response(request)
+        rejected = self.check_rate(user)
+        if rejected is not None:
+            return rejected
+        try:
+            with self.limiter:
+                if mode == PROFILE_SQL:
+                    response = self.profile_sql(request)
+                else:
+                    response = self.profile_cprofile(request)
+        except ServiceBusy as error:
+            return self.rejected(error.status_code, error.wait)
+        add_never_cache_headers(response)
+        return response
+
+    async def __acall__(self, request):
+        mode = self.get_mode(request)
+        user = (
+            await sync_to_async(self.get_staff_user)(request) if mode
+            else None
+        )
+        if user is None:
+            return await self.get_response(request)
+        rejected = self.check_rate(user)
+        if rejected is not None:
+            return rejected
+        try:
+            with self.limiter:
+                if mode == PROFILE_SQL:
+                    response = await self.aprofile_sql(request)
+                else:
+                    response = await self.aprofile_cprofile(request)
+        except ServiceBusy as error:
+            return self.rejected(error.status_code, error.wait)
+        add_never_cache_headers(response)
+        return response
+
+    @staticmethod
+    def get_mode(request):
+        mode = request.GET.get(QUERY_PARAM_PROFILE)
+        if (
+            not settings.PROFILING_ENABLED
+            or mode not in (PROFILE_CPROFILE, PROFILE_SQL)
+        ):
+            return None
+        return mode
+
+    def check_rate(self, user):
+        wait = self.buckets.consume(
+            user.pk, *parse_rate(settings.PROFILING_RATE)
+        )
+        return self.rejected(429, math.ceil(wait)) if wait else None
+
+    @staticmethod
+    def get_staff_user(request):
+        """Сотрудник из сессии (админка) или из токена API."""
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            try:
+                credentials = TokenAuthentication().authenticate(request)
+            except APIException:
+                return None
+            user = credentials[0] if credentials else None
+        return user if user is not None and user.is_staff else None
+
+    @staticmethod
+    def rejected(status, retry_after):
+        response = JsonResponse(
+            {'detail': 'Профилирование недоступно, повторите позже.'},
+            status=status
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
+
+    def profile_cprofile(self, request):
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with profiler_enabled(profiler):
+            response = self.get_response(request)
+        return self.get_cprofile_response(
+            request, response, time.perf_counter() - start, profiler
+        )
+
+    async def aprofile_cprofile(self, request):
+        profiler = cProfile.Profile()
+        add_thread_context(request, partial(profiler_enabled, profiler))
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.get_cprofile_response(
+            request, response, time.perf_counter() - start, profiler
+        )
+
+    @staticmethod
+    def get_cprofile_response(request, response, duration, profiler):
+        response.close()
+        profiler.create_stats()
+        if request.GET.get(QUERY_PARAM_PROFILE_FORMAT) == PROFILE_FORMAT_PROF:
+            profile = HttpResponse(
+                marshal.dumps(profiler.stats),
+                content_type='application/octet-stream'
+            )
+            profile['Content-Disposition'] = get_content_disposition(
+                PROFILE_FILENAME, as_attachment=True
+            )
+            return profile
+        stream = io.StringIO()
+        stream.write(
+            f'{request.method} {request.get_full_path()}\n'
+            f'Статус ответа: {response.status_code}, '
+            f'время: {duration * 1000:.1f} мс\n\n'
+        )
+        if profiler.stats:
+            pstats.Stats(profiler, stream=stream).sort_stats(
+                pstats.SortKey.CUMULATIVE
+            ).print_stats(PROFILING_STATS_LIMIT)
+        else:
+            # В ASGI профилируются только представления, вынесенные в поток.
+            stream.write('Нет вызовов для профиля.\n')
+        return HttpResponse(
+            stream.getvalue(),
+            content_type='text/plain; charset=utf-8'
+        )
+
+    def profile_sql(self, request):
+        queries = []
+        start = time.perf_counter()
+        with capture_queries(queries):
+            response = self.get_response(request)
+        return self.get_sql_response(
+            response, time.perf_counter() - start, queries
+        )
+
+    async def aprofile_sql(self, request):
+        queries = []
+        add_thread_context(request, partial(capture_queries, queries))
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.get_sql_response(
+            response, time.perf_counter() - start, queries
+        )
+
+    @staticmethod
+    def get_sql_response(response, duration, queries):
+        response.close()
+        return JsonResponse(
+            {
+                'status': response.status_code,
+                'time': round(duration * 1000, 3),
+                'sql_time': round(
+                    sum(query['time'] for query in queries), 3
+                ),
+                'count': len(queries),
+                'queries': queries[:PROFILING_MAX_QUERIES],
+            },
+            json_dumps_params={'ensure_ascii': False}
+        )
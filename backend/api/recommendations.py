@@ -0,0 +1,160 @@
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from foodgram.constants import RECOMMENDATIONS_CART_WEIGHT
+from recipes.models import Favorite, Recipe, RecipeNeighbors, ShoppingCart
+
+NEIGHBORS_BATCH_SIZE = 1000
+
+
+def get_feedback_matrix():
+    """
+    Разреженная матрица пользователь x рецепт из неявных оценок:
+    1 за рецепт в избранном, RECOMMENDATIONS_CART_WEIGHT за рецепт
+    в списке покупок, оценки одного рецепта складываются.
+    Возвращает матрицу и id рецептов по ее столбцам.
+    """
+    pairs = [
+        (
+            np.array(
+                model.objects.values_list('user_id', 'recipe_id'),
+                dtype=np.int64
+            ).reshape(-1, 2),
+            weight
+        )
+        for model, weight in (
+            (Favorite, 1.0),
+            (ShoppingCart, RECOMMENDATIONS_CART_WEIGHT),
+        )
+    ]
+    users, recipes = np.concatenate([rows for rows, _ in pairs]).T
+    weights = np.concatenate([
+        np.full(len(rows), weight) for rows, weight in pairs
+    ])
+    user_ids, rows = np.unique(users, return_inverse=True)
+    recipe_ids, columns = np.unique(recipes, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (weights, (rows, columns)),
+        shape=(len(user_ids), len(recipe_ids))
+    )
+    return matrix, recipe_ids
+
+
+def get_item_neighbors(matrix, neighbors_count, batch_size):
+    """
+    Top-k соседей каждого столбца матрицы по косинусной близости.
+    Столбцы нормируются, и X^T X считается блоками по batch_size
+    столбцов, чтобы не держать в памяти всю матрицу близостей.
+    Отбор top-k в блоке векторный: сортировка по (столбец, -близость)
+    и ранг элемента внутри своего столбца.
+    Выдает тройки массивов (столбец, соседний столбец, близость).
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)))
+    normalized = (matrix @ sparse.diags(1 / norms.ravel())).tocsc()
+    transposed = normalized.T.tocsr()
+    for start in range(0, normalized.shape[1], batch_size):
+        block = (
+            transposed @ normalized[:, start:start + batch_size]
+        ).tocoo()
+        items = block.col + start
+        # Близость рецепта с самим собой не нужна.
+        keep = np.flatnonzero(block.row != items)
+        order = keep[np.lexsort((-block.data[keep], items[keep]))]
+        items = items[order]
+        neighbors = block.row[order]
+        scores = block.data[order]
+        ranks = np.arange(len(items)) - np.searchsorted(items, items)
+        top = ranks < neighbors_count
+        yield items[top], neighbors[top], scores[top]
+
+
+def build_recommendations(neighbors_count, batch_size):
+    """
+    Пересобирает соседей рецептов (RecipeNeighbors) по избранному
+    и спискам покупок. Старые соседи заменяются в одной транзакции,
+    так что рекомендации не пропадают на время пересборки.
+    """
+    matrix, recipe_ids = get_feedback_matrix()
+    created = 0
+    with transaction.atomic():
+        RecipeNeighbors.objects.all().delete()
+        if not matrix.nnz:
+            return created
+        for items, neighbors, scores in get_item_neighbors(
+            matrix, neighbors_count, batch_size
+        ):
+            starts = np.flatnonzero(np.r_[True, items[1:] != items[:-1]])
+            RecipeNeighbors.objects.bulk_create(
+                (
+                    RecipeNeighbors(
+                        recipe_id=recipe_id,
+                        neighbor_ids=neighbor_ids.tobytes(),
+                        scores=item_scores.tobytes()
+                    )
+                    for recipe_id, neighbor_ids, item_scores in zip(
+                        recipe_ids[items[starts]].tolist(),
+                        np.split(recipe_ids[neighbors], starts[1:]),
+                        np.split(scores.astype(np.float32), starts[1:])
+                    )
+                ),
+                batch_size=NEIGHBORS_BATCH_SIZE
+            )
+            created += len(starts)
+    return created
+
+
+def get_recommended_recipe_ids(user, limit):
+    """
+    Рекомендации пользователю, от лучших: сумма близостей соседей
+    его рецептов из избранного и покупок с весами этих рецептов.
+    Оценки всех кандидатов считаются одним проходом NumPy,
+    рецепты, уже добавленные в избранное или покупки, исключаются.
+    Соседи хранят id на момент пересборки, поэтому удаленные с тех пор
+    рецепты отбрасываются до отбора лучших, и выдача не становится
+    короче limit.
+    """
+    favorite_ids = list(
+        Favorite.objects.filter(user=user).values_list('recipe_id', flat=True)
+    )
+    cart_ids = list(
+        ShoppingCart.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True)
+    )
+    rows = list(
+        RecipeNeighbors.objects.filter(
+            recipe_id__in={*favorite_ids, *cart_ids}
+        ).values_list('recipe_id', 'neighbor_ids', 'scores')
+    )
+    if not rows:
+        return []
+    sources = np.array([recipe_id for recipe_id, _, _ in rows])
+    neighbors = [np.frombuffer(ids, dtype=np.int64) for _, ids, _ in rows]
+    scores = np.concatenate([
+        np.frombuffer(item_scores, dtype=np.float32)
+        for _, _, item_scores in rows
+    ])
+    weights = (
+        np.isin(sources, favorite_ids)
+        + np.isin(sources, cart_ids) * RECOMMENDATIONS_CART_WEIGHT
+    )
+    candidate_ids, positions = np.unique(
+        np.concatenate(neighbors), return_inverse=True
+    )
+    candidate_scores = np.bincount(
+        positions,
+        weights=scores * np.repeat(weights, [len(ids) for ids in neighbors])
+    )
+    keep = ~np.isin(candidate_ids, favorite_ids + cart_ids)
+    candidate_ids = candidate_ids[keep]
+    candidate_scores = candidate_scores[keep]
+    keep = np.isin(candidate_ids, list(
+        Recipe.objects.filter(
+            pk__in=candidate_ids.tolist()
+        ).values_list('pk', flat=True)
+    ))
+    candidate_ids = candidate_ids[keep]
+    candidate_scores = candidate_scores[keep]
+    top = np.argsort(-candidate_scores, kind='stable')[:limit]
+    return candidate_ids[top].tolist()
@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Разделители строк, которые JSONRenderer экранирует для совместимости
+# с JavaScript.
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson с тем же выводом, что у JSONRenderer.
+    Без установленного orjson и при запросе отступов (?format=json
+    с indent, browsable API) используется стандартный json.
+    Типы, которые orjson не сериализует сам (Decimal, ленивые строки,
+    даты), передаются в кодировщик DRF.
+    """
+    encoder = JSONRenderer.encoder_class()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(
+            accepted_media_type,
+            renderer_context or {}
+        ) is not None:
+            return super().render(
+                data,
+                accepted_media_type,
+                renderer_context
+            )
+        content = orjson.dumps(
+            data,
+            default=self.encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
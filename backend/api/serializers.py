@@ -1,4 +1,6 @@
 from django.core.validators import MinValueValidator
+from django.db import transaction
+from django.db.models import QuerySet
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
@@ -10,16 +12,23 @@ from recipes.models import (
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingListJob,
     Subscriptions,
     Tag
 )
 from users.models import User
+from .fieldsets import (
+    SparseFieldsetsSerializerMixin,
+    is_expanded,
+    is_requested
+)
 from .services import (
     PHRASE_FOR_VALIDATE_FAVORITE,
     PHRASE_FOR_VALIDATE_SHOPPING_CART,
     add_tags_and_ingredients,
     validate_favorite_shopping_cart
 )
+from .user_flags import get_request_user_flags
 
 
 class BaseSerializer(serializers.ModelSerializer):
@@ -58,14 +67,14 @@ class TagSerializer(serializers.ModelSerializer):
     """Сериализатор для модели тегов на чтение данных."""
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'color', 'slug')
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для модели ингредиентов на чтение данных."""
     class Meta:
         model = Ingredient
-        fields = '__all__'
+        fields = ('id', 'name', 'measurement_unit')
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
@@ -90,7 +99,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         )
 
 
-class UserReadSerializer(UserSerializer):
+class UserReadSerializer(SparseFieldsetsSerializerMixin, UserSerializer):
     """Сериализатор для модели пользователей на чтение данных."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -106,10 +115,8 @@ class UserReadSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        try:
-            return obj.following_subscriptions.exists()
-        except AttributeError:
-            return False
+        flags = get_request_user_flags(self.context.get('request'))
+        return flags is not None and flags.is_subscribed(obj.id)
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -188,10 +195,217 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_favorited(self, obj):
-        return Favorite.objects.filter(recipe=obj).exists()
+        flags = get_request_user_flags(self.context.get('request'))
+        return flags is not None and flags.is_favorited(obj.id)
 
     def get_is_in_shopping_cart(self, obj):
-        return ShoppingCart.objects.filter(recipe=obj).exists()
+        flags = get_request_user_flags(self.context.get('request'))
+        return flags is not None and flags.is_in_shopping_cart(obj.id)
+
+
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+USER_READ_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+RECIPE_INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+RECIPE_INGREDIENT_SHORT_FIELDS = ('id', 'amount')
+RECIPE_READ_FIELDS = (
+    'id',
+    'tags',
+    'author',
+    'ingredients',
+    'is_favorited',
+    'is_in_shopping_cart',
+    'name',
+    'image',
+    'text',
+    'cooking_time',
+)
+# Поле рецепта -> колонка, которую оно требует в запросе.
+RECIPE_COLUMNS = (
+    ('author', 'author_id'),
+    ('name', 'name'),
+    ('image', 'image'),
+    ('text', 'text'),
+    ('cooking_time', 'cooking_time'),
+)
+
+
+def get_image_url(image, request):
+    """Абсолютный URL картинки рецепта, как его выводит ImageField."""
+    name = getattr(image, 'name', image)
+    if not name:
+        return None
+    url = Recipe._meta.get_field('image').storage.url(name)
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+class RecipeRow:
+    """Строка рецепта из values_list для быстрой сериализации."""
+    __slots__ = ('id', 'name', 'image', 'text', 'cooking_time', 'author_id')
+
+    def __init__(self, **values):
+        for column in self.__slots__:
+            setattr(self, column, values.get(column))
+
+
+def get_recipe_columns(context):
+    """Колонки рецепта, нужные для полей из ?fields=."""
+    return ('id',) + tuple(
+        column for field, column in RECIPE_COLUMNS
+        if is_requested(context, field)
+    )
+
+
+def get_recipe_rows(queryset, columns=RecipeRow.__slots__):
+    """Выбирает только колонки, нужные для вывода рецептов."""
+    return [
+        RecipeRow(**dict(zip(columns, row)))
+        for row in queryset.values_list(*columns)
+    ]
+
+
+class RecipeFastListSerializer(serializers.ListSerializer):
+    """
+    Сериализация страницы рецептов без вложенных сериализаторов:
+    авторы, теги и ингредиенты выбираются тремя запросами на всю страницу
+    и собираются в словари того же формата, что у RecipeReadSerializer.
+    Поля не из ?fields= не выводятся и не запрашиваются, связи не из
+    ?expand= выводятся идентификаторами без соединения со своей таблицей.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, QuerySet):
+            data = get_recipe_rows(data, get_recipe_columns(self.context))
+        recipes = list(data)
+        if not recipes:
+            return []
+        context = self.context
+        request = context.get('request')
+        fields = [
+            field for field in RECIPE_READ_FIELDS
+            if is_requested(context, field)
+        ]
+        recipe_ids = [recipe.id for recipe in recipes]
+        values = {
+            'id': lambda recipe: recipe.id,
+            'name': lambda recipe: recipe.name,
+            'image': lambda recipe: get_image_url(recipe.image, request),
+            'text': lambda recipe: recipe.text,
+            'cooking_time': lambda recipe: recipe.cooking_time,
+        }
+        if 'author' in fields:
+            if is_expanded(context, 'author'):
+                authors = self.get_authors(recipes, request)
+                values['author'] = (
+                    lambda recipe: authors.get(recipe.author_id)
+                )
+            else:
+                values['author'] = lambda recipe: recipe.author_id
+        if 'tags' in fields:
+            tags = self.get_tags(recipe_ids, is_expanded(context, 'tags'))
+            values['tags'] = lambda recipe: tags[recipe.id]
+        if 'ingredients' in fields:
+            ingredients = self.get_ingredients(
+                recipe_ids,
+                is_expanded(context, 'ingredients')
+            )
+            values['ingredients'] = lambda recipe: ingredients[recipe.id]
+        if 'is_favorited' in fields or 'is_in_shopping_cart' in fields:
+            flags = get_request_user_flags(request)
+            values['is_favorited'] = (
+                lambda recipe: (
+                    flags is not None and flags.is_favorited(recipe.id)
+                )
+            )
+            values['is_in_shopping_cart'] = (
+                lambda recipe: (
+                    flags is not None and flags.is_in_shopping_cart(recipe.id)
+                )
+            )
+        return [
+            {field: values[field](recipe) for field in fields}
+            for recipe in recipes
+        ]
+
+    @staticmethod
+    def get_authors(recipes, request):
+        flags = get_request_user_flags(request)
+        authors = {
+            author['id']: author
+            for author in User.objects.filter(
+                pk__in={recipe.author_id for recipe in recipes}
+            ).values(*USER_READ_FIELDS)
+        }
+        for author_id, author in authors.items():
+            author['is_subscribed'] = (
+                flags is not None and flags.is_subscribed(author_id)
+            )
+        return authors
+
+    @staticmethod
+    def get_tags(recipe_ids, expanded):
+        tags = {recipe_id: [] for recipe_id in recipe_ids}
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        )
+        if not expanded:
+            for recipe_id, tag_id in recipe_tags.order_by(
+                'tag_id'
+            ).values_list('recipe_id', 'tag_id'):
+                tags[recipe_id].append(tag_id)
+            return tags
+        tag_cache = {}
+        for recipe_id, *values in recipe_tags.order_by(
+            'tag__name'
+        ).values_list(
+            'recipe_id',
+            *(f'tag__{field}' for field in TAG_FIELDS)
+        ):
+            tag = tag_cache.get(values[0])
+            if tag is None:
+                tag = tag_cache[values[0]] = dict(zip(TAG_FIELDS, values))
+            tags[recipe_id].append(tag)
+        return tags
+
+    @staticmethod
+    def get_ingredients(recipe_ids, expanded):
+        ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+        fields = (
+            RECIPE_INGREDIENT_FIELDS if expanded
+            else RECIPE_INGREDIENT_SHORT_FIELDS
+        )
+        columns = {
+            'id': 'ingredient_id',
+            'name': 'ingredient__name',
+            'measurement_unit': 'ingredient__measurement_unit',
+            'amount': 'amount',
+        }
+        for recipe_id, *values in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('pk').values_list(
+            'recipe_id',
+            *(columns[field] for field in fields)
+        ):
+            ingredients[recipe_id].append(dict(zip(fields, values)))
+        return ingredients
+
+
+class RecipeFastReadSerializer(serializers.BaseSerializer):
+    """
+    Сериализатор для чтения рецептов (list и retrieve) с тем же выводом,
+    что у RecipeReadSerializer, но без объектов полей на каждый рецепт.
+    Принимает рецепты и строки RecipeRow.
+    """
+
+    class Meta:
+        list_serializer_class = RecipeFastListSerializer
+
+    def to_representation(self, instance):
+        return RecipeFastListSerializer(
+            child=self,
+            context=self.context
+        ).to_representation([instance])[0]
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -265,6 +479,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -272,6 +487,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         add_tags_and_ingredients(ingredients, tags, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -280,7 +496,10 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
-        representation = RecipeReadSerializer(instance).data
+        representation = RecipeReadSerializer(
+            instance,
+            context=self.context
+        ).data
         return representation
 
 
@@ -300,7 +519,8 @@ class RecipeForSubscriptionsSerializer(serializers.ModelSerializer):
         )
 
 
-class SubscriptionsSerializer(serializers.ModelSerializer):
+class SubscriptionsSerializer(SparseFieldsetsSerializerMixin,
+                              serializers.ModelSerializer):
     """
     Сериализатор для чтения, создания и удаления данных для модели подписок.
     """
@@ -339,16 +559,27 @@ class SubscriptionsSerializer(serializers.ModelSerializer):
         return data
 
     def get_is_subscribed(self, obj):
-        try:
-            return obj.following_subscriptions.exists()
-        except AttributeError:
-            return False
+        flags = get_request_user_flags(self.context.get('request'))
+        return flags is not None and flags.is_subscribed(obj.id)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if 'recipes' in fields and not is_expanded(self.context, 'recipes'):
+            fields['recipes'] = serializers.PrimaryKeyRelatedField(
+                many=True,
+                read_only=True
+            )
+        return fields
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
     def to_representation(self, instance):
         data = super(SubscriptionsSerializer, self).to_representation(instance)
+        if 'recipes' not in data:
+            return data
         recipes = data.pop('recipes')
         recipes_limit = self.context.get('recipes_limit')
         if recipes_limit:
@@ -385,7 +616,8 @@ class RecipeShoppingCartSerializer(BaseSerializer):
 
     class Meta:
         model = ShoppingCart
-        fields = BaseSerializer.Meta.fields
+        fields = BaseSerializer.Meta.fields + ('servings',)
+        extra_kwargs = {'servings': {'write_only': True}}
 
     def validate(self, data):
         return validate_favorite_shopping_cart(
@@ -394,3 +626,24 @@ class RecipeShoppingCartSerializer(BaseSerializer):
             ShoppingCart,
             PHRASE_FOR_VALIDATE_SHOPPING_CART
         )
+
+
+class ShoppingListSerializer(serializers.Serializer):
+    """Сериализатор позиций списка покупок, суммированных по единицам."""
+    name = serializers.CharField(source='ingredient__name')
+    measurement_unit = serializers.CharField()
+    amount = serializers.IntegerField(source='total_quantity')
+
+
+class ShoppingListJobSerializer(serializers.ModelSerializer):
+    """Сериализатор заданий на формирование PDF со списком покупок."""
+
+    class Meta:
+        model = ShoppingListJob
+        fields = (
+            'id',
+            'status',
+            'error',
+            'created_at',
+            'finished_at',
+        )
@@ -1,7 +1,15 @@
 from io import BytesIO
 
 from django.conf import settings
-from django.db.models import Sum
+from django.db.models import (
+    Case,
+    CharField,
+    F,
+    IntegerField,
+    Sum,
+    Value,
+    When
+)
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from reportlab.pdfbase import pdfmetrics
@@ -10,40 +18,60 @@ from reportlab.pdfgen import canvas
 from rest_framework import serializers, status
 from rest_framework.response import Response
 
-from recipes.models import RecipeIngredient, ShoppingCart
+from foodgram.constants import UNIT_CONVERSIONS
+from recipes.models import RecipeIngredient, ShoppingListItem
 
 
-def draw_pdf_file(unique_ingredients):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = (
-        'attachment; filename="shopping_cart.pdf"'
-    )
+FONT_NAME = 'Caviar-dreams'
 
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer)
+SHOPPING_LIST_FILENAME = 'shopping_cart.pdf'
+
+PDF_BOTTOM_MARGIN = 60
+
+
+def register_fonts():
+    """
+    Регистрирует шрифты для PDF один раз при запуске приложения,
+    чтобы при preload_app они разделялись воркерами gunicorn.
+    """
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(
+                FONT_NAME,
+                str(settings.BASE_DIR / 'fonts/caviar-dreams.ttf')
+            )
+        )
+
+
+def start_pdf_page(p):
     p.setFillColorRGB(0.9, 0.9, 0.9)  # Устанавливаем серый цвет фона
     p.rect(-1, 0, 600, 843, fill=1)  # Ставим размер рамки фона
     p.setFillColorRGB(0, 0, 0)  # Делаем цвет текста - черным
+    p.setFont(FONT_NAME, 12)
 
-    pdfmetrics.registerFont(
-        TTFont(
-            'Caviar-dreams',
-            str(settings.BASE_DIR / 'fonts/caviar-dreams.ttf')
-        )
-    )
-    p.setFont("Caviar-dreams", 12)
+
+def render_shopping_list_pdf(unique_ingredients):
+    """Рисует PDF со списком покупок и возвращает его содержимое."""
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer)
+    register_fonts()
+    start_pdf_page(p)
 
     y_position = 800
     p.drawString(250, y_position, "Список покупок:")
 
     y_position -= 20
     for ingredient in unique_ingredients:
+        if y_position < PDF_BOTTOM_MARGIN:
+            p.showPage()
+            start_pdf_page(p)
+            y_position = 800
         p.drawString(
             100,
             y_position,
             f"{ingredient['ingredient__name']} - "
             f"{ingredient['total_quantity']} "
-            f"{ingredient['ingredient__measurement_unit']}"
+            f"{ingredient['measurement_unit']}"
         )
         y_position -= 20
 
@@ -57,23 +85,59 @@ def draw_pdf_file(unique_ingredients):
 
     pdf = buffer.getvalue()
     buffer.close()
+    return pdf
 
-    response.write(pdf)
 
+def draw_pdf_file(unique_ingredients):
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = (
+        f'attachment; filename="{SHOPPING_LIST_FILENAME}"'
+    )
+    response.write(render_shopping_list_pdf(unique_ingredients))
     return response
 
 
+def get_unit_conversion():
+    """
+    Выражения базовой единицы измерения и множителя перевода в нее
+    по таблице UNIT_CONVERSIONS, остальные единицы не переводятся.
+    """
+    unit = 'ingredient__measurement_unit'
+    base_unit = Case(
+        *(
+            When(**{unit: source}, then=Value(target))
+            for source, (target, _) in UNIT_CONVERSIONS.items()
+        ),
+        default=F(unit),
+        output_field=CharField()
+    )
+    factor = Case(
+        *(
+            When(**{unit: source}, then=Value(multiplier))
+            for source, (_, multiplier) in UNIT_CONVERSIONS.items()
+        ),
+        default=Value(1),
+        output_field=IntegerField()
+    )
+    return base_unit, factor
+
+
 def get_shopping_cart_ingredients(current_user):
-    user = current_user
-    user_shopping_cart = ShoppingCart.objects.filter(user=user)
-    unique_ingredients = RecipeIngredient.objects.filter(
-        recipe__in=user_shopping_cart.values('recipe')
+    """
+    Суммирует позиции материализованного списка покупок:
+    совместимые единицы приводятся к базовой (кг -> г, л -> мл,
+    ст. л. -> ч. л.), порции уже учтены в позициях.
+    """
+    base_unit, factor = get_unit_conversion()
+    return ShoppingListItem.objects.filter(
+        user=current_user
+    ).annotate(
+        measurement_unit=base_unit
     ).values(
-        'ingredient__name', 'ingredient__measurement_unit'
+        'ingredient__name', 'measurement_unit'
     ).annotate(
-        total_quantity=Sum('amount')
-    )
-    return unique_ingredients
+        total_quantity=Sum(F('total') * factor)
+    ).order_by('ingredient__name', 'measurement_unit')
 
 
 def get_post_method_add_object(
@@ -90,12 +154,14 @@ def get_post_method_add_object(
         context={"request": request}
     )
     if serializer.is_valid(raise_exception=True):
-        model.objects.create(
+        created = model.objects.create(
             user=user,
-            recipe=current_recipe
+            recipe=current_recipe,
+            **serializer.validated_data
         )
-        serializer.save(user=user, recipe=current_recipe)
-        return Response(serializer.data,
+        # Без serializer.save(): он сохранил бы сам рецепт, сдвинув
+        # updated_at и пересчитав поисковый вектор.
+        return Response(serializer.to_representation(created),
                         status=status.HTTP_201_CREATED)
 
 
@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.db.models import F, Sum
+
+from recipes.models import RecipeIngredient, ShoppingListItem
+from users.models import User
+
+
+def get_shopping_list_totals(user_ids=None, ingredient_ids=None):
+    """
+    Суммы ингредиентов из списков покупок, посчитанные по исходным
+    таблицам: (пользователь, ингредиент) -> количество с учетом порций.
+    """
+    rows = RecipeIngredient.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(recipe__shoppingcart_recipe__user_id__in=user_ids)
+    else:
+        rows = rows.filter(recipe__shoppingcart_recipe__isnull=False)
+    if ingredient_ids is not None:
+        rows = rows.filter(ingredient_id__in=ingredient_ids)
+    rows = rows.values(
+        'recipe__shoppingcart_recipe__user_id', 'ingredient_id'
+    ).annotate(
+        total=Sum(F('amount') * F('recipe__shoppingcart_recipe__servings'))
+    ).order_by()
+    return {
+        (row['recipe__shoppingcart_recipe__user_id'], row['ingredient_id']):
+            row['total']
+        for row in rows
+    }
+
+
+def refresh_shopping_lists(user_ids, ingredient_ids=None):
+    """
+    Пересчитывает позиции материализованного списка покупок пользователей.
+    Если переданы ингредиенты, пересчитываются только их позиции.
+    Строки пользователей блокируются, чтобы параллельные пересчеты
+    одного списка не пересекались.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    with transaction.atomic():
+        list(
+            User.objects.select_for_update().filter(
+                pk__in=user_ids
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+        items = ShoppingListItem.objects.filter(user_id__in=user_ids)
+        if ingredient_ids is not None:
+            items = items.filter(ingredient_id__in=ingredient_ids)
+        items.delete()
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total=total
+            )
+            for (user_id, ingredient_id), total in get_shopping_list_totals(
+                user_ids, ingredient_ids
+            ).items()
+        )
@@ -0,0 +1,122 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from foodgram.constants import SHOPPING_LIST_JOB_TIMEOUT
+from recipes.models import ShoppingListJob, shopping_list_upload_to
+from .services import (
+    SHOPPING_LIST_FILENAME,
+    get_shopping_cart_ingredients,
+    render_shopping_list_pdf
+)
+
+logger = logging.getLogger(__name__)
+
+# Подробности ошибки пишутся в журнал, пользователю они не показываются.
+JOB_ERROR_MESSAGE = 'Не удалось сформировать список покупок.'
+
+
+def enqueue_shopping_list_job(user):
+    """
+    Ставит в очередь формирование PDF со списком покупок.
+    Если у пользователя уже есть задание в очереди, возвращается оно:
+    список читается при выполнении, поэтому результат будет актуальным.
+    """
+    job = ShoppingListJob.objects.filter(
+        user=user,
+        status=ShoppingListJob.PENDING
+    ).first()
+    if job is None:
+        job = ShoppingListJob.objects.create(user=user)
+    return job
+
+
+def claim_shopping_list_job():
+    """
+    Забирает самое старое задание из очереди.
+    Захват выполняется условным UPDATE, поэтому одно задание не достается
+    двум воркерам. Задания, зависшие в running дольше
+    SHOPPING_LIST_JOB_TIMEOUT, считаются брошенными и выдаются снова.
+    """
+    now = timezone.now()
+    available = Q(status=ShoppingListJob.PENDING) | Q(
+        status=ShoppingListJob.RUNNING,
+        started_at__lt=now - timedelta(seconds=SHOPPING_LIST_JOB_TIMEOUT)
+    )
+    while True:
+        job = ShoppingListJob.objects.filter(available).order_by(
+            'created_at', 'pk'
+        ).only('pk', 'status', 'started_at').first()
+        if job is None:
+            return None
+        claimed = ShoppingListJob.objects.filter(
+            pk=job.pk,
+            status=job.status,
+            started_at=job.started_at
+        ).update(status=ShoppingListJob.RUNNING, started_at=now)
+        if claimed:
+            return ShoppingListJob.objects.get(pk=job.pk)
+
+
+def process_shopping_list_job(job):
+    try:
+        pdf = render_shopping_list_pdf(
+            get_shopping_cart_ingredients(job.user_id)
+        )
+        job.file.save(SHOPPING_LIST_FILENAME, ContentFile(pdf), save=False)
+        job.status = ShoppingListJob.DONE
+    except Exception:
+        logger.exception('Задание %s: ошибка формирования PDF.', job.pk)
+        job.status = ShoppingListJob.FAILED
+        job.error = JOB_ERROR_MESSAGE
+    job.finished_at = timezone.now()
+    job.save(update_fields=('status', 'file', 'error', 'finished_at'))
+
+
+def run_shopping_list_jobs(max_jobs=None):
+    """Выполняет задания из очереди, пока она не опустеет."""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        close_old_connections()
+        job = claim_shopping_list_job()
+        if job is None:
+            break
+        process_shopping_list_job(job)
+        processed += 1
+    close_old_connections()
+    return processed
+
+
+def delete_expired_shopping_list_jobs(max_age):
+    """
+    Удаляет завершенные задания старше max_age секунд вместе с PDF,
+    а также файлы списков того же возраста, на которые не ссылается
+    ни одно задание (например, если задание не сохранилось после файла).
+    Возвращает число удаленных заданий и файлов.
+    """
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    expired = ShoppingListJob.objects.filter(
+        status__in=(ShoppingListJob.DONE, ShoppingListJob.FAILED),
+        finished_at__lt=cutoff
+    )
+    files = list(expired.exclude(file='').values_list('file', flat=True))
+    jobs_count, _ = expired.delete()
+    storage = ShoppingListJob._meta.get_field('file').storage
+    for name in files:
+        storage.delete(name)
+    directory = os.path.dirname(shopping_list_upload_to(None, ''))
+    if storage.exists(directory):
+        for filename in storage.listdir(directory)[1]:
+            name = os.path.join(directory, filename)
+            if (
+                storage.get_modified_time(name) < cutoff
+                and not ShoppingListJob.objects.filter(file=name).exists()
+            ):
+                storage.delete(name)
+                files.append(name)
+    return jobs_count, len(files)
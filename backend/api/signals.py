@@ -0,0 +1,143 @@
+from collections import defaultdict
+from functools import partial
+from weakref import WeakKeyDictionary
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscriptions
+)
+from .feed import add_author_to_feed, fan_out_recipe, remove_author_from_feed
+from .fuzzy import invalidate_trigram_index
+from .shopping_list import refresh_shopping_lists
+from .similar import update_similarity_buckets
+from .user_flags import invalidate_user_flags
+
+
+# Ключи отложенных пакетов по подключению и обработчику, см. on_commit_batch.
+pending_batches = WeakKeyDictionary()
+
+
+def on_commit_batch(handler, *keys):
+    """
+    Откладывает handler до фиксации транзакции, собирая ключи всех
+    вызовов в ней: например, при замене ингредиентов рецепта пересчет
+    выполняется один раз, а не для каждой строки. Каждый вызов
+    регистрирует свою функцию on_commit, и первая из них после
+    фиксации забирает все накопленные ключи, остальные ничего не делают.
+    Ключи отмененных изменений (откат транзакции или точки сохранения)
+    попадут в следующий пакет этого подключения: обработчики
+    пересчитывают данные по текущему состоянию БД, так что лишний
+    ключ дает только лишнюю работу.
+    """
+    connection = transaction.get_connection()
+    batches = pending_batches.setdefault(connection, {})
+    batches.setdefault(handler, set()).update(keys)
+    transaction.on_commit(partial(run_batch, connection, handler))
+
+
+def run_batch(connection, handler):
+    keys = pending_batches.get(connection, {}).pop(handler, None)
+    if keys:
+        handler(keys)
+
+
+def refresh_recipes_shopping_lists(recipe_ingredients):
+    """
+    Пересчитывает измененные ингредиенты рецептов в списках покупок
+    пользователей, у которых рецепт добавлен в покупки.
+    """
+    ingredient_ids = defaultdict(set)
+    for recipe_id, ingredient_id in recipe_ingredients:
+        ingredient_ids[recipe_id].add(ingredient_id)
+    user_ids = defaultdict(list)
+    for recipe_id, user_id in ShoppingCart.objects.filter(
+        recipe_id__in=ingredient_ids
+    ).values_list('recipe_id', 'user_id'):
+        user_ids[recipe_id].append(user_id)
+    for recipe_id, recipe_user_ids in user_ids.items():
+        refresh_shopping_lists(recipe_user_ids, ingredient_ids[recipe_id])
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_recipe_flags(sender, instance, **kwargs):
+    """Сбрасывает флаги пользователя при изменении избранного и покупок."""
+    transaction.on_commit(partial(invalidate_user_flags, instance.user_id))
+
+
+@receiver(post_save, sender=Subscriptions)
+@receiver(post_delete, sender=Subscriptions)
+def invalidate_subscription_flags(sender, instance, **kwargs):
+    """Сбрасывает флаги подписчика при изменении подписок."""
+    transaction.on_commit(
+        partial(invalidate_user_flags, instance.follower_id)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_name_index(sender, instance, **kwargs):
+    """Сбрасывает резервный индекс триграмм при изменении названий."""
+    transaction.on_commit(partial(invalidate_trigram_index, sender))
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def refresh_cart_shopping_list(sender, instance, **kwargs):
+    """Пересчитывает список покупок при изменении рецептов в нем."""
+    transaction.on_commit(
+        partial(refresh_shopping_lists, [instance.user_id])
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def refresh_recipe_shopping_lists(sender, instance, **kwargs):
+    """Пересчитывает ингредиент в списках покупок с этим рецептом."""
+    on_commit_batch(
+        refresh_recipes_shopping_lists,
+        (instance.recipe_id, instance.ingredient_id)
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def refresh_recipe_similarity_buckets(sender, instance, **kwargs):
+    """Пересчитывает корзины похожих рецептов по новым ингредиентам."""
+    on_commit_batch(update_similarity_buckets, instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    if created:
+        transaction.on_commit(partial(fan_out_recipe, instance.pk))
+
+
+@receiver(post_save, sender=Subscriptions)
+def add_following_to_feed(sender, instance, created, **kwargs):
+    """Добавляет рецепты автора в ленту нового подписчика."""
+    if created:
+        transaction.on_commit(partial(
+            add_author_to_feed, instance.follower_id, instance.following_id
+        ))
+
+
+@receiver(post_delete, sender=Subscriptions)
+def remove_following_from_feed(sender, instance, **kwargs):
+    """Убирает рецепты автора из ленты при отписке."""
+    transaction.on_commit(partial(
+        remove_author_from_feed, instance.follower_id, instance.following_id
+    ))
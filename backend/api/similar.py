@@ -0,0 +1,130 @@
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+
+from foodgram.constants import (
+    SIMILAR_RECIPES_BANDS,
+    SIMILAR_RECIPES_CANDIDATES,
+    SIMILAR_RECIPES_ROWS,
+    SIMILAR_RECIPES_SEED
+)
+from recipes.models import RecipeIngredient, SimilarityBucket
+
+# Хэш-функции MinHash: h(x) = (a * x + b) mod p, где x - id ингредиента.
+PRIME = (1 << 31) - 1
+HASH_COUNT = SIMILAR_RECIPES_BANDS * SIMILAR_RECIPES_ROWS
+
+_random = np.random.RandomState(SIMILAR_RECIPES_SEED)
+HASH_A = _random.randint(1, PRIME, size=HASH_COUNT).astype(np.uint64)
+HASH_B = _random.randint(0, PRIME, size=HASH_COUNT).astype(np.uint64)
+# Нечетные множители сворачивают значения полосы в номер корзины,
+# соль своя у каждой полосы, чтобы корзины разных полос не совпадали.
+BAND_MULTIPLIERS = _random.randint(
+    1, 1 << 62, size=SIMILAR_RECIPES_ROWS, dtype=np.int64
+).astype(np.uint64) | np.uint64(1)
+BAND_SALTS = _random.randint(
+    0, 1 << 62, size=SIMILAR_RECIPES_BANDS, dtype=np.int64
+).astype(np.uint64)
+BUCKET_MASK = np.uint64((1 << 63) - 1)
+
+BUCKET_BATCH_SIZE = 10000
+
+
+def get_signatures(ingredient_ids, starts):
+    """
+    MinHash-сигнатуры рецептов: ingredient_ids - ингредиенты рецептов
+    подряд, starts - индексы начала каждого рецепта в этом массиве.
+    Все хэши считаются одной матрицей, минимумы по рецептам - reduceat.
+    """
+    values = np.asarray(ingredient_ids, dtype=np.uint64)[:, np.newaxis]
+    hashes = (values * HASH_A + HASH_B) % np.uint64(PRIME)
+    return np.minimum.reduceat(hashes, starts, axis=0)
+
+
+def get_buckets(signatures):
+    """Номера LSH-корзин по полосам сигнатур, неотрицательные int64."""
+    bands = signatures.reshape(
+        len(signatures), SIMILAR_RECIPES_BANDS, SIMILAR_RECIPES_ROWS
+    )
+    # Переполнение uint64 здесь ожидаемо: нужна только перемешанность.
+    buckets = (bands * BAND_MULTIPLIERS).sum(axis=2, dtype=np.uint64)
+    return ((buckets + BAND_SALTS) & BUCKET_MASK).astype(np.int64)
+
+
+def get_recipe_buckets(recipe_ids):
+    """Пары (рецепт, корзина) по текущим ингредиентам рецептов."""
+    rows = np.array(
+        RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('recipe_id').values_list('recipe_id', 'ingredient_id'),
+        dtype=np.int64
+    )
+    if not len(rows):
+        return []
+    recipes = rows[:, 0]
+    starts = np.flatnonzero(np.r_[True, recipes[1:] != recipes[:-1]])
+    buckets = get_buckets(get_signatures(rows[:, 1], starts))
+    return zip(
+        np.repeat(recipes[starts], SIMILAR_RECIPES_BANDS).tolist(),
+        buckets.ravel().tolist()
+    )
+
+
+def update_similarity_buckets(recipe_ids, replace=True):
+    """
+    Пересчитывает корзины рецептов. При полной пересборке корзины
+    удаляются заранее, и replace=False пропускает удаление по рецептам.
+    """
+    with transaction.atomic():
+        if replace:
+            SimilarityBucket.objects.filter(recipe_id__in=recipe_ids).delete()
+        SimilarityBucket.objects.bulk_create(
+            (
+                SimilarityBucket(recipe_id=recipe_id, bucket=bucket)
+                for recipe_id, bucket in get_recipe_buckets(recipe_ids)
+            ),
+            batch_size=BUCKET_BATCH_SIZE
+        )
+
+
+def get_similar_recipe_ids(recipe_id, limit):
+    """
+    Похожие рецепты по набору ингредиентов, от самых похожих.
+    Кандидаты берутся из общих LSH-корзин по индексу (bucket, recipe),
+    лучшие по числу общих корзин переранжируются по точному
+    коэффициенту Жаккара.
+    """
+    candidates = list(
+        SimilarityBucket.objects.filter(
+            bucket__in=SimilarityBucket.objects.filter(
+                recipe_id=recipe_id
+            ).values('bucket')
+        ).exclude(
+            recipe_id=recipe_id
+        ).values('recipe_id').annotate(
+            shared=Count('pk')
+        ).order_by('-shared', 'recipe_id').values_list(
+            'recipe_id', flat=True
+        )[:SIMILAR_RECIPES_CANDIDATES]
+    )
+    if not candidates:
+        return []
+    ingredients = defaultdict(set)
+    for candidate_id, ingredient_id in RecipeIngredient.objects.filter(
+        recipe_id__in=[recipe_id, *candidates]
+    ).values_list('recipe_id', 'ingredient_id'):
+        ingredients[candidate_id].add(ingredient_id)
+    target = ingredients[recipe_id]
+    scores = {
+        candidate_id: (
+            len(target & ingredients[candidate_id])
+            / len(target | ingredients[candidate_id])
+        )
+        for candidate_id in candidates
+        if ingredients[candidate_id]
+    }
+    return sorted(
+        scores, key=lambda candidate_id: (-scores[candidate_id], candidate_id)
+    )[:limit]
@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from foodgram.constants import SLOW_LOG_EXPLAINED_MAX_SIZE
+from .thread_contexts import add_thread_context
+
+logger = logging.getLogger('foodgram.slow')
+
+# Списки параметров IN (%s, %s, ...) разной длины дают один отпечаток.
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+WHITESPACE = re.compile(r'\s+')
+EXPLAINABLE = ('SELECT', 'WITH')
+
+
+def get_fingerprint(sql):
+    """Нормализованный текст запроса без значений и его отпечаток."""
+    normalized = IN_LIST.sub('IN (...)', WHITESPACE.sub(' ', sql).strip())
+    return normalized, hashlib.md5(normalized.encode()).hexdigest()[:16]
+
+
+def get_params_shape(params):
+    """
+    Форма параметров без значений: типы подряд со счетчиком повторов,
+    например ['int x3', 'str'].
+    """
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        params = params.values()
+    shape = []
+    for name in (type(param).__name__ for param in params):
+        if shape and shape[-1][0] == name:
+            shape[-1][1] += 1
+        else:
+            shape.append([name, 1])
+    return [
+        name if count == 1 else f'{name} x{count}' for name, count in shape
+    ]
+
+
+class ExplainedQueries:
+    """
+    Отпечатки запросов, план которых уже записан этим процессом.
+    EXPLAIN выполняется только при первом медленном выполнении запроса,
+    число отпечатков ограничено SLOW_LOG_EXPLAINED_MAX_SIZE.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._fingerprints = set()
+        self._lock = threading.Lock()
+
+    def add(self, fingerprint):
+        """True, если отпечаток новый и план нужно записать."""
+        with self._lock:
+            if (
+                fingerprint in self._fingerprints
+                or len(self._fingerprints) >= self.max_size
+            ):
+                return False
+            self._fingerprints.add(fingerprint)
+            return True
+
+
+explained_queries = ExplainedQueries(SLOW_LOG_EXPLAINED_MAX_SIZE)
+
+
+def explain(alias, sql, params):
+    """План запроса PostgreSQL в JSON, без выполнения (без ANALYZE)."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+    except DatabaseError as error:
+        return {'error': str(error)}
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+class RequestQueries:
+    """
+    Обертка выполнения запросов БД на время HTTP-запроса: считает
+    запросы и их время, медленные запоминает для журнала.
+    """
+
+    def __init__(self):
+        self.captured = False
+        self.count = 0
+        self.time = 0.0
+        self.slow = []
+
+    @contextmanager
+    def capture(self):
+        """Обертки на всех подключениях текущего потока."""
+        self.captured = True
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(self.wrapper(alias))
+                )
+            yield
+
+    def wrapper(self, alias):
+        def execute_wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                self.count += 1
+                self.time += duration
+                if duration * 1000 >= settings.SLOW_QUERY_MS:
+                    self.slow.append((alias, sql, params, many, duration))
+        return execute_wrapper
+
+
+def write(event):
+    logger.info(json.dumps(event, ensure_ascii=False, default=str))
+
+
+class SlowLogMiddleware:
+    """
+    Журнал медленных запросов: HTTP-запрос дольше SLOW_REQUEST_MS
+    и запрос к БД дольше SLOW_QUERY_MS записываются строкой JSON
+    в логгер foodgram.slow (файл с ротацией, см. LOGGING).
+    В записи маршрут, id пользователя, отпечаток SQL и форма
+    параметров без значений; для PostgreSQL при первом появлении
+    отпечатка в процессе добавляется план EXPLAIN.
+    В асинхронной цепочке (ASGI) запросы к БД учитываются, если
+    представление выполняется в потоке через api.async_views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.SLOW_LOG_ENABLED:
+            return self.get_response(request)
+        queries = RequestQueries()
+        start = time.perf_counter()
+        with queries.capture():
+            response = self.get_response(request)
+        self.log(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.SLOW_LOG_ENABLED:
+            return await self.get_response(request)
+        queries = RequestQueries()
+        add_thread_context(request, queries.capture)
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        duration = time.perf_counter() - start
+        # Пользователь сессии и EXPLAIN требуют запросов к БД,
+        # поэтому запись выполняется вне цикла событий.
+        if self.is_slow(duration, queries):
+            await sync_to_async(self.log)(
+                request, response, duration, queries
+            )
+        return response
+
+    @staticmethod
+    def is_slow(duration, queries):
+        return duration * 1000 >= settings.SLOW_REQUEST_MS or queries.slow
+
+    @staticmethod
+    def get_context(request):
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'route': match.view_name if match else None,
+            'method': request.method,
+            'path': request.path,
+            'query_params': sorted(request.GET),
+            'user_id': user.pk if user and user.is_authenticated else None,
+        }
+
+    def log(self, request, response, duration, queries):
+        if duration * 1000 >= settings.SLOW_REQUEST_MS:
+            event = {
+                'type': 'request',
+                **self.get_context(request),
+                'status': response.status_code,
+                'time_ms': round(duration * 1000, 1),
+            }
+            if queries.captured:
+                event['queries'] = queries.count
+                event['sql_time_ms'] = round(queries.time * 1000, 1)
+            write(event)
+        if not queries.slow:
+            return
+        context = self.get_context(request)
+        for alias, sql, params, many, query_duration in queries.slow:
+            normalized, fingerprint = get_fingerprint(sql)
+            event = {
+                'type': 'query',
+                **context,
+                'alias': alias,
+                'time_ms': round(query_duration * 1000, 1),
+                'fingerprint': fingerprint,
+                'sql': normalized,
+                'params': None if many else get_params_shape(params),
+            }
+            if (
+                settings.SLOW_LOG_EXPLAIN
+                and not many
+                and connections[alias].vendor == 'postgresql'
+                and normalized.upper().startswith(EXPLAINABLE)
+                and explained_queries.add(fingerprint)
+            ):
+                event['explain'] = explain(alias, sql, params)
+            write(event)
@@ -0,0 +1,69 @@
+import json
+
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from .utils import create_tag, create_user
+
+
+class AsgiInstrumentationTests(TransactionTestCase):
+    """
+    Под ASGI горячие представления выполняются в пуле потоков,
+    и профилирование и журнал медленных запросов должны видеть их SQL.
+    У потоков пула свои соединения, поэтому данные фиксируются
+    (TransactionTestCase), а соединения закрываются после каждого
+    запроса, чтобы не пережить тестовую базу.
+    """
+
+    def setUp(self):
+        settings_dict = connections['default'].settings_dict
+        self.addCleanup(
+            settings_dict.__setitem__,
+            'CONN_MAX_AGE',
+            settings_dict['CONN_MAX_AGE']
+        )
+        settings_dict['CONN_MAX_AGE'] = 0
+        self.staff = create_user('staff', is_staff=True)
+        self.token = Token.objects.create(user=self.staff)
+        create_tag('breakfast')
+
+    def get(self, path):
+        return self.async_client.get(
+            path, AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+    async def test_sql_profile_captures_offloaded_queries(self):
+        response = await self.get('/api/tags/?_profile=sql')
+        self.assertEqual(response.status_code, 200)
+        profile = json.loads(response.content)
+        self.assertEqual(profile['status'], 200)
+        self.assertGreater(profile['count'], 0)
+        self.assertTrue(any(
+            'recipes_tag' in query['sql'] for query in profile['queries']
+        ))
+
+    async def test_cprofile_profiles_offloaded_view(self):
+        response = await self.get('/api/tags/?_profile=cprofile')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('function calls', response.content.decode())
+
+    @override_settings(
+        SLOW_LOG_ENABLED=True,
+        SLOW_QUERY_MS=0,
+        SLOW_REQUEST_MS=0,
+        SLOW_LOG_EXPLAIN=False
+    )
+    async def test_slow_log_records_offloaded_queries(self):
+        with self.assertLogs('foodgram.slow') as logs:
+            response = await self.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        events = [json.loads(record.getMessage()) for record in logs.records]
+        request_event = next(
+            event for event in events if event['type'] == 'request'
+        )
+        self.assertGreater(request_event['queries'], 0)
+        self.assertTrue(any(
+            event['type'] == 'query' and 'recipes_tag' in event['sql']
+            for event in events
+        ))
@@ -0,0 +1,100 @@
+import time
+
+from django.test import TestCase
+from django.utils.http import http_date
+
+from .utils import (
+    create_ingredient,
+    create_recipe,
+    create_tag,
+    create_user,
+    get_token_client
+)
+
+
+class ConditionalGetTests(TestCase):
+    """Условные GET-запросы отвечают 304 только по ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.reader = create_user('reader')
+        cls.tag = create_tag('soup')
+        cls.ingredient = create_ingredient('salt')
+        cls.recipes = [
+            create_recipe(
+                cls.author, f'Рецепт {index}', [cls.ingredient], [cls.tag]
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        self.client = get_token_client(self.reader)
+
+    def test_list_has_etag_without_last_modified(self):
+        response = self.client.get('/api/recipes/')
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get(
+            '/api/recipes/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def get_list_etag(self):
+        return self.client.get('/api/recipes/')['ETag']
+
+    def test_list_etag_ignores_users_without_recipes(self):
+        etag = self.get_list_etag()
+        self.reader.first_name = 'Читатель'
+        self.reader.save()
+        self.assertEqual(self.get_list_etag(), etag)
+
+    def test_list_etag_follows_authors_tags_and_ingredients(self):
+        for obj, field, value in (
+            (self.author, 'first_name', 'Повар'),
+            (self.tag, 'name', 'Супы'),
+            (self.ingredient, 'name', 'соль'),
+        ):
+            with self.subTest(model=type(obj).__name__):
+                etag = self.get_list_etag()
+                setattr(obj, field, value)
+                obj.save()
+                self.assertNotEqual(self.get_list_etag(), etag)
+
+    def test_if_modified_since_after_delete_returns_fresh_list(self):
+        response = self.client.get('/api/recipes/')
+        etag = response['ETag']
+        self.assertEqual(response.json()['count'], 3)
+        self.recipes[0].delete()
+        # Дата в будущем дала бы 304 при любом Last-Modified.
+        future = http_date(time.time() + 3600)
+        response = self.client.get(
+            '/api/recipes/', HTTP_IF_MODIFIED_SINCE=future
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+        response = self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_after_unsubscribe(self):
+        url = '/api/users/subscriptions/'
+        subscribe_url = f'/api/users/{self.author.pk}/subscribe/'
+        self.client.post(subscribe_url)
+        self.assertEqual(self.client.get(url).json()['count'], 1)
+        self.client.delete(subscribe_url)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 3600)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_favorite_and_cart_do_not_touch_recipe(self):
+        recipe = self.recipes[1]
+        updated_at = recipe.updated_at
+        for action in ('favorite', 'shopping_cart'):
+            response = self.client.post(f'/api/recipes/{recipe.pk}/{action}/')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json()['id'], recipe.pk)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.updated_at, updated_at)
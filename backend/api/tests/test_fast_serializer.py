@@ -0,0 +1,148 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.feed import add_author_to_feed
+from api.serializers import RecipeReadSerializer
+from recipes.models import Favorite, Recipe, ShoppingCart, Subscriptions
+from .utils import (
+    create_ingredient,
+    create_recipe,
+    create_tag,
+    create_user,
+    get_token_client
+)
+
+FIELDSETS = (
+    {},
+    {'fields': 'id,name,image,cooking_time'},
+    {'fields': 'id,author,tags,ingredients', 'expand': 'author'},
+    {'expand': ''},
+    {'expand': 'tags,ingredients'},
+    {'fields': 'id,is_favorited,is_in_shopping_cart,text'},
+)
+
+
+def get_reference(recipe, request, fields=None, expand=None):
+    """
+    Эталон вывода быстрого сериализатора: RecipeReadSerializer
+    с правилами ?fields= и ?expand=. Нераскрытые связи выводятся
+    идентификаторами: теги по id, ингредиенты как id и amount.
+    """
+    data = dict(RecipeReadSerializer(
+        recipe, context={'request': request}
+    ).data)
+    data['ingredients'] = sorted(
+        data['ingredients'], key=lambda ingredient: ingredient['id']
+    )
+    fields = None if fields is None else fields.split(',')
+    expand = None if expand is None else expand.split(',')
+    if expand is not None:
+        if 'author' not in expand:
+            data['author'] = data['author']['id']
+        if 'tags' not in expand:
+            data['tags'] = sorted(tag['id'] for tag in data['tags'])
+        if 'ingredients' not in expand:
+            data['ingredients'] = [
+                {'id': ingredient['id'], 'amount': ingredient['amount']}
+                for ingredient in data['ingredients']
+            ]
+    if fields is not None:
+        data = {name: value for name, value in data.items() if name in fields}
+    return data
+
+
+def normalize(data):
+    data = dict(data)
+    if isinstance(data.get('ingredients'), list):
+        data['ingredients'] = sorted(
+            data['ingredients'], key=lambda ingredient: ingredient['id']
+        )
+    return data
+
+
+class FastSerializerGoldenTests(TestCase):
+    """
+    Вывод RecipeFastReadSerializer в list, retrieve и feed совпадает
+    с RecipeReadSerializer при любых ?fields= и ?expand=.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        authors = [create_user('chef'), create_user('baker')]
+        tags = [
+            create_tag(slug, color)
+            for slug, color in (
+                ('soup', '#E26C2D'), ('dinner', '#49B64E'), ('fast', '#8775D2')
+            )
+        ]
+        ingredients = [
+            create_ingredient(name) for name in ('salt', 'beet', 'flour')
+        ]
+        cls.recipes = [
+            create_recipe(authors[0], 'Борщ', ingredients[:2], tags[:2]),
+            create_recipe(authors[0], 'Щи', ingredients[::-1], tags[1:]),
+            create_recipe(authors[1], 'Хлеб', ingredients[2:], tags[2:]),
+            create_recipe(authors[1], 'Вода', [], []),
+        ]
+        Subscriptions.objects.create(
+            follower=cls.reader, following=authors[0]
+        )
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[1])
+        with override_settings(FEED_FANOUT_ENABLED=True):
+            add_author_to_feed(cls.reader.pk, authors[0].pk)
+
+    def setUp(self):
+        self.client = get_token_client(self.reader)
+
+    def get_request(self):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.reader
+        return request
+
+    def assert_page_matches(self, response, recipes, params):
+        self.assertEqual(response.status_code, 200)
+        request = self.get_request()
+        self.assertEqual(
+            [normalize(result) for result in response.json()['results']],
+            [get_reference(recipe, request, **params) for recipe in recipes]
+        )
+
+    def test_list(self):
+        recipes = list(Recipe.objects.all())
+        for params in FIELDSETS:
+            with self.subTest(**params):
+                self.assert_page_matches(
+                    self.client.get('/api/recipes/', params), recipes, params
+                )
+
+    def test_detail(self):
+        for recipe in self.recipes:
+            for params in FIELDSETS:
+                with self.subTest(recipe=recipe.name, **params):
+                    response = self.client.get(
+                        f'/api/recipes/{recipe.pk}/', params
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        normalize(response.json()),
+                        get_reference(recipe, self.get_request(), **params)
+                    )
+
+    def test_feed(self):
+        recipes = list(
+            Recipe.objects.filter(
+                author=self.recipes[0].author
+            ).order_by('-pub_date', '-id')
+        )
+        for fanout in (False, True):
+            for params in FIELDSETS:
+                with self.subTest(fanout=fanout, **params), override_settings(
+                    FEED_FANOUT_ENABLED=fanout
+                ):
+                    self.assert_page_matches(
+                        self.client.get('/api/recipes/feed/', params),
+                        recipes,
+                        params
+                    )
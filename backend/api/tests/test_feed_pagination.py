@@ -0,0 +1,84 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.feed import add_author_to_feed
+from recipes.models import Recipe, Subscriptions
+from .utils import create_recipe, create_user, get_token_client
+
+PAGE_SIZE = 2
+
+
+class FeedPaginationTests(TestCase):
+    """
+    Лента листается по ключу (pub_date, id) в обе стороны без пропусков
+    и повторов, в том числе среди рецептов с одной датой публикации.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        author = create_user('chef')
+        recipes = [
+            create_recipe(author, f'Рецепт {index}') for index in range(7)
+        ]
+        # Пять рецептов с одной датой: позиция в ленте задается id.
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes[1:6]]
+        ).update(pub_date=timezone.now())
+        create_recipe(create_user('stranger'), 'Чужой рецепт')
+        Subscriptions.objects.create(follower=cls.reader, following=author)
+        with override_settings(FEED_FANOUT_ENABLED=True):
+            add_author_to_feed(cls.reader.pk, author.pk)
+        cls.expected = list(
+            Recipe.objects.filter(author=author).order_by(
+                '-pub_date', '-id'
+            ).values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        self.client = get_token_client(self.reader)
+
+    def walk(self, url, link):
+        """Страницы по ссылкам link и адрес последней из них."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([recipe['id'] for recipe in data['results']])
+            url, last_url = data[link], url
+        return pages, last_url
+
+    def test_pages_forward_and_back(self):
+        for fanout in (False, True):
+            with self.subTest(fanout=fanout), override_settings(
+                FEED_FANOUT_ENABLED=fanout
+            ):
+                pages, last_url = self.walk(
+                    f'/api/recipes/feed/?limit={PAGE_SIZE}', 'next'
+                )
+                self.assertEqual(sum(pages, []), self.expected)
+                self.assertTrue(
+                    all(len(page) <= PAGE_SIZE for page in pages)
+                )
+                pages, _ = self.walk(last_url, 'previous')
+                self.assertEqual(sum(pages[::-1], []), self.expected)
+
+    def test_page_uses_row_comparison_without_offset(self):
+        first = self.client.get(f'/api/recipes/feed/?limit={PAGE_SIZE}')
+        for fanout in (False, True):
+            with self.subTest(fanout=fanout), override_settings(
+                FEED_FANOUT_ENABLED=fanout
+            ), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(first.json()['next'])
+            self.assertEqual(response.status_code, 200)
+            sql = '\n'.join(query['sql'] for query in queries)
+            self.assertIn('"pub_date", ', sql)
+            self.assertIn(') < (', sql)
+            self.assertNotIn('OFFSET', sql)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/feed/?cursor=broken')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,44 @@
+from django.test import TestCase
+
+from api.fuzzy import TrigramIndex, fuzzy_search, get_trigram_index
+from foodgram.constants import FUZZY_SEARCH_LIMIT
+from recipes.models import Ingredient
+
+MATCHES_COUNT = FUZZY_SEARCH_LIMIT + 5
+
+
+class FuzzySearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'cheese {index}', measurement_unit='г')
+            for index in range(MATCHES_COUNT)
+        )
+
+    def test_no_limit_returns_all_matches(self):
+        queryset = Ingredient.objects.all()
+        self.assertEqual(
+            len(fuzzy_search(queryset, 'name', 'cheese', None)),
+            MATCHES_COUNT
+        )
+        self.assertEqual(
+            len(fuzzy_search(queryset, 'name', 'cheese')),
+            FUZZY_SEARCH_LIMIT
+        )
+
+    def test_index_no_limit_returns_all_matches(self):
+        index = TrigramIndex(Ingredient.objects.values_list('pk', 'name'))
+        self.assertEqual(len(index.search('cheese', 0.6)), MATCHES_COUNT)
+        self.assertEqual(len(index.search('cheese', 0.6, 3)), 3)
+
+    def test_index_rebuilds_after_change_in_other_process(self):
+        index = get_trigram_index(Ingredient, 'name')
+        self.assertIs(get_trigram_index(Ingredient, 'name'), index)
+        # bulk_create не отправляет сигналов, как запись другим процессом.
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='parmesan', measurement_unit='г')]
+        )
+        rebuilt = get_trigram_index(Ingredient, 'name')
+        self.assertIsNot(rebuilt, index)
+        self.assertTrue(rebuilt.search('parmesan', 0.6))
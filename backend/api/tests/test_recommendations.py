@@ -0,0 +1,46 @@
+from django.test import TestCase
+
+from api.recommendations import (
+    build_recommendations,
+    get_recommended_recipe_ids
+)
+from recipes.models import Favorite, Recipe
+from .utils import create_recipe, create_user
+
+LIMIT = 2
+
+
+class RecommendationsTests(TestCase):
+    """Рекомендации по соседям рецептов из избранного."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('chef')
+        cls.reader = create_user('reader')
+        cls.recipes = [
+            create_recipe(author, f'Рецепт {index}') for index in range(5)
+        ]
+        first, *others = cls.recipes
+        # Чем больше общих читателей с первым рецептом, тем выше сосед.
+        for index, recipe in enumerate(others):
+            for number in range(len(others) - index):
+                user = create_user(f'user{index}{number}')
+                Favorite.objects.bulk_create([
+                    Favorite(user=user, recipe=first),
+                    Favorite(user=user, recipe=recipe),
+                ])
+        Favorite.objects.create(user=cls.reader, recipe=first)
+        build_recommendations(neighbors_count=10, batch_size=100)
+
+    def test_recommendations_ordered_by_score(self):
+        self.assertEqual(
+            get_recommended_recipe_ids(self.reader, LIMIT),
+            [recipe.pk for recipe in self.recipes[1:1 + LIMIT]]
+        )
+
+    def test_deleted_recipes_do_not_shorten_recommendations(self):
+        Recipe.objects.filter(pk=self.recipes[1].pk).delete()
+        self.assertEqual(
+            get_recommended_recipe_ids(self.reader, LIMIT),
+            [recipe.pk for recipe in self.recipes[2:2 + LIMIT]]
+        )
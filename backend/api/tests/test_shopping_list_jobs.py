@@ -0,0 +1,94 @@
+import io
+import os
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api.shopping_list_jobs import (
+    JOB_ERROR_MESSAGE,
+    delete_expired_shopping_list_jobs
+)
+from recipes.models import ShoppingCart, ShoppingListJob
+from .utils import (
+    TempMediaMixin,
+    create_ingredient,
+    create_recipe,
+    create_user,
+    get_token_client
+)
+
+
+@override_settings(FILE_ACCEL_REDIRECT_ENABLED=False)
+class ShoppingListJobsTests(TempMediaMixin, TransactionTestCase):
+    """
+    Очередь PDF со списками покупок от постановки задания до скачивания.
+    Воркеры run_workers работают в своих потоках и соединениях,
+    поэтому данные теста фиксируются (TransactionTestCase).
+    """
+
+    def setUp(self):
+        self.user = create_user('buyer')
+        recipe = create_recipe(
+            create_user('author'), 'Омлет', [create_ingredient('eggs', 'шт')]
+        )
+        ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        self.client = get_token_client(self.user)
+
+    def enqueue(self):
+        response = self.client.post('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 202)
+        return response
+
+    @staticmethod
+    def run_workers():
+        call_command(
+            'run_workers', '--once', '--workers', '1', stdout=io.StringIO()
+        )
+
+    def test_enqueue_render_download(self):
+        location = self.enqueue()['Location']
+        self.assertEqual(self.client.get(location).json()['status'], 'pending')
+        self.run_workers()
+        job = self.client.get(location).json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['error'], '')
+        response = self.client.get(f'{location}download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(
+            b'%PDF'
+        ))
+
+    def test_failed_job_hides_error_details(self):
+        location = self.enqueue()['Location']
+        with mock.patch(
+            'api.shopping_list_jobs.render_shopping_list_pdf',
+            side_effect=RuntimeError('/srv/fonts/secret.ttf')
+        ), self.assertLogs('api.shopping_list_jobs', 'ERROR') as logs:
+            self.run_workers()
+        job = self.client.get(location).json()
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], JOB_ERROR_MESSAGE)
+        self.assertIn('secret.ttf', logs.output[0])
+
+    def test_expired_jobs_and_orphan_files_are_deleted(self):
+        self.enqueue()
+        self.run_workers()
+        job = ShoppingListJob.objects.get()
+        storage = job.file.storage
+        orphan = storage.save('shopping_lists/orphan.pdf', ContentFile(b'x'))
+        fresh = storage.save('shopping_lists/fresh.pdf', ContentFile(b'x'))
+        old = time.time() - 3600
+        os.utime(storage.path(orphan), (old, old))
+        self.assertEqual(delete_expired_shopping_list_jobs(600), (0, 1))
+        ShoppingListJob.objects.update(
+            finished_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(delete_expired_shopping_list_jobs(600), (1, 1))
+        self.assertFalse(ShoppingListJob.objects.exists())
+        self.assertFalse(storage.exists(job.file.name))
+        self.assertTrue(storage.exists(fresh))
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from api import signals
+from foodgram.constants import SIMILAR_RECIPES_BANDS
+from recipes.models import ShoppingCart, ShoppingListItem, SimilarityBucket
+from .utils import (
+    IMAGE,
+    TempMediaMixin,
+    create_ingredient,
+    create_recipe,
+    create_tag,
+    create_user,
+    get_token_client
+)
+
+
+class RecipeIngredientSignalsTests(TempMediaMixin, TestCase):
+    """Замена ингредиентов рецепта пересчитывается одним пакетом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.buyer = create_user('buyer')
+        cls.tag = create_tag('lunch')
+        cls.ingredients = [
+            create_ingredient(f'ingredient {index}') for index in range(6)
+        ]
+        cls.recipe = create_recipe(
+            cls.author, 'Суп', cls.ingredients[:3], [cls.tag]
+        )
+        ShoppingCart.objects.create(user=cls.buyer, recipe=cls.recipe)
+
+    def test_update_queues_one_batch_per_handler(self):
+        client = get_token_client(self.author)
+        with mock.patch.object(
+            signals,
+            'refresh_recipes_shopping_lists',
+            wraps=signals.refresh_recipes_shopping_lists
+        ) as refresh_lists, mock.patch.object(
+            signals,
+            'update_similarity_buckets',
+            wraps=signals.update_similarity_buckets
+        ) as update_buckets, self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': 50}
+                        for ingredient in self.ingredients[2:]
+                    ],
+                    'tags': [self.tag.pk],
+                    'image': IMAGE,
+                },
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        refresh_lists.assert_called_once()
+        update_buckets.assert_called_once()
+        self.assertIn(self.recipe.pk, update_buckets.call_args.args[0])
+        self.assertEqual(
+            set(
+                ShoppingListItem.objects.filter(
+                    user=self.buyer
+                ).values_list('ingredient_id', 'total')
+            ),
+            {(ingredient.pk, 50) for ingredient in self.ingredients[2:]}
+        )
+        self.assertEqual(
+            SimilarityBucket.objects.filter(recipe=self.recipe).count(),
+            SIMILAR_RECIPES_BANDS
+        )
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.test import TestCase
+
+from api.user_flags import UserFlagsCache, user_flags_cache
+from recipes.models import Favorite
+from users.models import User
+from .utils import create_recipe, create_user, get_token_client
+
+
+class UserFlagsTests(TestCase):
+    """Версия флагов хранится в БД и общая для всех процессов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.recipe = create_recipe(cls.author, 'Борщ')
+
+    def setUp(self):
+        user_flags_cache.clear()
+
+    def test_invalidation_is_seen_by_other_process_cache(self):
+        # Кэш другого процесса: его запись не удаляется при инвалидации.
+        other_cache = UserFlagsCache(settings.USER_FLAGS_CACHE_MAX_BYTES)
+        user = User.objects.get(pk=self.user.pk)
+        flags = other_cache.get(user.pk, user.flags_updated_at)
+        self.assertFalse(flags.is_favorited(self.recipe.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+        user = User.objects.get(pk=self.user.pk)
+        flags = other_cache.get(user.pk, user.flags_updated_at)
+        self.assertTrue(flags.is_favorited(self.recipe.pk))
+
+    def test_api_reflects_favorite_changes(self):
+        client = get_token_client(self.user)
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.assertFalse(client.get(url).json()['is_favorited'])
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(f'{url}favorite/')
+        self.assertTrue(client.get(url).json()['is_favorited'])
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete(f'{url}favorite/')
+        self.assertFalse(client.get(url).json()['is_favorited'])
@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAAD'
+    'ElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC'
+)
+
+
+class TempMediaMixin:
+    """Загруженные в тестах файлы пишутся во временный MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        cls.addClassCleanup(media_override.disable)
+        super().setUpClass()
+
+
+def create_user(username, **fields):
+    return User.objects.create_user(
+        email=f'{username}@example.com',
+        username=username,
+        first_name=username.title(),
+        last_name='Тестов',
+        password='Pa55w0rd!',
+        **fields
+    )
+
+
+def get_token_client(user):
+    """Клиент API, авторизованный токеном пользователя."""
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def create_tag(slug, color='#E26C2D'):
+    return Tag.objects.create(name=slug.title(), color=color, slug=slug)
+
+
+def create_ingredient(name, measurement_unit='г'):
+    return Ingredient.objects.create(
+        name=name, measurement_unit=measurement_unit
+    )
+
+
+def create_recipe(author, name, ingredients=(), tags=(), cooking_time=10):
+    """Рецепт без загрузки картинки: поле хранит только имя файла."""
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text=f'Описание: {name}',
+        cooking_time=cooking_time,
+        image='recipes/test.png'
+    )
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=100)
+        for ingredient in ingredients
+    )
+    return recipe
@@ -0,0 +1,25 @@
+from contextlib import ExitStack, contextmanager
+
+THREAD_CONTEXTS_ATTR = '_thread_contexts'
+
+
+def add_thread_context(request, context_factory):
+    """
+    Регистрирует контекст для кода запроса, вынесенного в поток.
+    В асинхронной цепочке (ASGI) посредники не видят работу с БД,
+    выполняемую в пуле потоков: обертки выполнения запросов и профилировщик
+    привязаны к потоку. Такой посредник передает фабрику контекста,
+    и помощник выноса в поток входит в него вокруг представления.
+    """
+    request.__dict__.setdefault(THREAD_CONTEXTS_ATTR, []).append(
+        context_factory
+    )
+
+
+@contextmanager
+def thread_contexts(request):
+    """Входит в контексты запроса в текущем потоке в порядке регистрации."""
+    with ExitStack() as stack:
+        for context_factory in getattr(request, THREAD_CONTEXTS_ATTR, ()):
+            stack.enter_context(context_factory())
+        yield
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Частота вида '10/min' в пару (емкость корзины, токенов в секунду)."""
+    num, period = rate.split('/')
+    num = int(num)
+    return num, num / DURATIONS[period[0]]
+
+
+class TokenBuckets:
+    """
+    Корзины токенов в памяти процесса, по одной на ключ.
+    Корзина пополняется со временем до емкости, запрос забирает
+    один токен. Число корзин ограничено: при переполнении
+    вытесняется давно не использованная, и ее ключ начинает
+    с полной корзиной.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """Забирает токен: 0, если он был, иначе секунды до следующего."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class ScopedTokenBucketThrottle(BaseThrottle):
+    """
+    Ограничение частоты дорогих действий вьюсета.
+    Область задается словарем throttle_scopes вьюсета (действие -> область),
+    частота области - в DEFAULT_THROTTLE_RATES. Считается отдельно для
+    каждого пользователя, для анонимных - по IP. Действия без области
+    не ограничиваются. Корзины хранятся в памяти процесса без обращений
+    к кэшу, поэтому общий предел равен частоте, умноженной на число
+    процессов.
+    """
+    buckets = TokenBuckets(settings.THROTTLE_BUCKETS_MAX_SIZE)
+
+    def __init__(self):
+        self._wait = 0
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scopes', {}).get(
+            getattr(view, 'action', None)
+        )
+        if scope is None:
+            return True
+        try:
+            rate = api_settings.DEFAULT_THROTTLE_RATES[scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'Не задана частота для области "{scope}".'
+            )
+        if rate is None:
+            return True
+        ident = (
+            request.user.pk if request.user.is_authenticated
+            else self.get_ident(request)
+        )
+        self._wait = self.buckets.consume((scope, ident), *parse_rate(rate))
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class ServiceBusy(APIException):
+    """503 с Retry-After: обработчик исключений DRF берет его из wait."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер занят, повторите запрос позже.'
+    default_code = 'service_busy'
+
+    def __init__(self, wait, detail=None, code=None):
+        super().__init__(detail, code)
+        self.wait = wait
+
+
+class ConcurrencyLimiter:
+    """
+    Ограничивает число одновременных выполнений блока в процессе.
+    Если все места заняты, запрос не ждет в очереди, а сразу получает
+    503 с Retry-After, и поток воркера освобождается.
+    """
+
+    def __init__(self, limit, retry_after):
+        self.retry_after = retry_after
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def __enter__(self):
+        if not self._semaphore.acquire(blocking=False):
+            raise ServiceBusy(self.retry_after)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._semaphore.release()
+
+
+pdf_render_limiter = ConcurrencyLimiter(
+    settings.PDF_RENDER_CONCURRENCY,
+    settings.PDF_RENDER_RETRY_AFTER
+)
@@ -0,0 +1,150 @@
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from recipes.models import Favorite, ShoppingCart, Subscriptions
+from users.models import User
+
+
+def _to_array(ids):
+    """Упаковывает id в отсортированный компактный массив 64-битных чисел."""
+    return array('q', sorted(ids))
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+class UserFlags:
+    """
+    Наборы флагов пользователя.
+    Хранит id избранных рецептов, рецептов в списке покупок
+    и авторов, на которых подписан пользователь.
+    """
+    __slots__ = ('version', 'favorites', 'shopping_cart', 'following')
+
+    def __init__(self, version, favorites, shopping_cart, following):
+        self.version = version
+        self.favorites = _to_array(favorites)
+        self.shopping_cart = _to_array(shopping_cart)
+        self.following = _to_array(following)
+
+    def is_favorited(self, recipe_id):
+        return _contains(self.favorites, recipe_id)
+
+    def is_in_shopping_cart(self, recipe_id):
+        return _contains(self.shopping_cart, recipe_id)
+
+    def is_subscribed(self, author_id):
+        return _contains(self.following, author_id)
+
+    @property
+    def size(self):
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.favorites)
+            + sys.getsizeof(self.shopping_cart)
+            + sys.getsizeof(self.following)
+        )
+
+
+class UserFlagsCache:
+    """
+    LRU-кэш наборов флагов пользователей, ограниченный по объему памяти.
+    Актуальность записи проверяется по версии пользователя -
+    полю User.flags_updated_at, которое меняется при каждой записи
+    в избранное, список покупок или подписки. Пользователь загружается
+    при аутентификации, поэтому версия не требует отдельного запроса
+    и одинакова во всех процессах.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        with self._lock:
+            flags = self._entries.get(user_id)
+            if flags is not None and flags.version == version:
+                self._entries.move_to_end(user_id)
+                return flags
+        flags = load_user_flags(user_id, version)
+        self._put(user_id, flags)
+        return flags
+
+    def discard(self, user_id):
+        with self._lock:
+            flags = self._entries.pop(user_id, None)
+            if flags is not None:
+                self.current_bytes -= flags.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _put(self, user_id, flags):
+        size = flags.size
+        with self._lock:
+            previous = self._entries.pop(user_id, None)
+            if previous is not None:
+                self.current_bytes -= previous.size
+            if size > self.max_bytes:
+                return
+            self._entries[user_id] = flags
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+
+
+def load_user_flags(user_id, version):
+    return UserFlags(
+        version,
+        Favorite.objects.filter(
+            user_id=user_id
+        ).values_list('recipe_id', flat=True),
+        ShoppingCart.objects.filter(
+            user_id=user_id
+        ).values_list('recipe_id', flat=True),
+        Subscriptions.objects.filter(
+            follower_id=user_id
+        ).values_list('following_id', flat=True),
+    )
+
+
+user_flags_cache = UserFlagsCache(settings.USER_FLAGS_CACHE_MAX_BYTES)
+
+
+def get_user_flags(user):
+    """Возвращает флаги пользователя или None для анонимного пользователя."""
+    if user is None or not user.is_authenticated:
+        return None
+    return user_flags_cache.get(user.pk, user.flags_updated_at)
+
+
+def get_request_user_flags(request):
+    """
+    Возвращает флаги пользователя запроса.
+    Результат запоминается на объекте запроса, чтобы при выводе
+    списка версия проверялась один раз.
+    """
+    if request is None:
+        return None
+    if not hasattr(request, '_user_flags'):
+        request._user_flags = get_user_flags(request.user)
+    return request._user_flags
+
+
+def invalidate_user_flags(user_id):
+    """Меняет версию флагов пользователя и удаляет их из памяти процесса."""
+    User.objects.filter(pk=user_id).update(flags_updated_at=timezone.now())
+    user_flags_cache.discard(user_id)
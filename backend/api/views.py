@@ -1,18 +1,31 @@
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db.models import Count, Prefetch
 from django.shortcuts import get_object_or_404
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from foodgram.constants import (
+    RECOMMENDATIONS_LIMIT,
+    RECOMMENDATIONS_MAX_LIMIT,
+    SIMILAR_RECIPES_LIMIT,
+    SIMILAR_RECIPES_MAX_LIMIT,
     URL_PATH_DOWNLOAD_SHOPPING_CART,
     URL_PATH_FAVORITE,
+    URL_PATH_FEED,
     URL_PATH_NAME,
     URL_PATH_PASSWORD,
+    URL_PATH_RECOMMENDED,
     URL_PATH_SHOPPING_CART,
+    URL_PATH_SHOPPING_LIST,
+    URL_PATH_SHOPPING_LIST_JOB,
+    URL_PATH_SHOPPING_LIST_JOB_DOWNLOAD,
+    URL_PATH_SIMILAR,
     URL_PATH_SUBSCRIBE,
     URL_PATH_SUBSCRIPTIONS
 )
@@ -21,32 +34,51 @@ from recipes.models import (
     Ingredient,
     Recipe,
     ShoppingCart,
+    ShoppingListJob,
     Subscriptions,
     Tag
 )
 from users.models import User
 from .filters import IngredientViewSetFilter, RecipeViewSetFilter
-from .pagintation import CustomPagination
+from .conditional import (
+    ConditionalGetMixin,
+    conditional_response,
+    get_etag
+)
+from .downloads import file_response
+from .feed import get_pull_feed, get_timeline_feed
+from .fieldsets import SparseFieldsetsViewMixin, is_expanded, is_requested
+from .pagintation import CustomPagination, FeedPagination, TimelinePagination
 from .permissions import IsOwnerOrAdminOrReadOnly
+from .recommendations import get_recommended_recipe_ids
 from .serializers import (
     CustomUserCreateSerializer,
     IngredientSerializer,
     RecipeCreateSerializer,
     RecipeFavoriteSerializer,
-    RecipeReadSerializer,
+    RecipeFastReadSerializer,
+    RecipeRow,
     RecipeShoppingCartSerializer,
+    ShoppingListJobSerializer,
+    ShoppingListSerializer,
     SubscriptionsSerializer,
     TagSerializer,
     UserReadSerializer,
+    get_recipe_columns,
+    get_recipe_rows
 )
 from .services import (
     PHRASE_FOR_FAVORITE,
     PHRASE_FOR_SHOPPING_CART,
+    SHOPPING_LIST_FILENAME,
     draw_pdf_file,
     get_delete_method_remove_object,
     get_post_method_add_object,
     get_shopping_cart_ingredients
 )
+from .shopping_list_jobs import enqueue_shopping_list_job
+from .similar import get_similar_recipe_ids
+from .throttling import pdf_render_limiter
 
 
 class TagViewSet(ReadOnlyModelViewSet):
@@ -73,7 +105,8 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     search_fields = ('^name',)
 
 
-class UserViewSet(ModelViewSet):
+class UserViewSet(SparseFieldsetsViewMixin, ConditionalGetMixin,
+                  ModelViewSet):
     """
     Вьюсет для пользователей.
     GET-запрос - получение списка пользователей.
@@ -83,6 +116,11 @@ class UserViewSet(ModelViewSet):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     pagination_class = CustomPagination
+    # Хэширование пароля - самое дорогое в этих действиях.
+    throttle_scopes = {
+        'create': 'user_create',
+        'set_password': 'set_password',
+    }
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -97,8 +135,20 @@ class UserViewSet(ModelViewSet):
             pagination_class=None)
     def me(self, request):
         """GET-запрос по me - получение конкретного пользователя."""
-        serializer = UserReadSerializer(request.user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return conditional_response(
+            request,
+            get_etag(
+                request,
+                (User.objects.filter(pk=request.user.pk),)
+            ),
+            lambda: Response(
+                UserReadSerializer(
+                    request.user,
+                    context=self.get_serializer_context()
+                ).data,
+                status=status.HTTP_200_OK
+            )
+        )
 
     @action(detail=False,
             methods=['POST'],
@@ -129,17 +179,44 @@ class UserViewSet(ModelViewSet):
             pagination_class=CustomPagination)
     def subscriptions(self, request):
         """GET-запрос по subscriptions - получение списка подписчиков."""
-        recipes_limit = request.query_params.get('recipes_limit')
+        context = self.get_serializer_context()
+        context['recipes_limit'] = request.query_params.get('recipes_limit')
+        # Порядок задан явно: Meta.ordering не применяется к запросам
+        # с GROUP BY, а recipes_count добавляет агрегат.
         users = User.objects.filter(
             following_subscriptions__follower=request.user
+        ).order_by(*User._meta.ordering)
+
+        def render():
+            page_users = users
+            if is_requested(context, 'recipes_count'):
+                page_users = page_users.annotate(
+                    recipes_count=Count('recipes')
+                )
+            if is_requested(context, 'recipes'):
+                page_users = page_users.prefetch_related(Prefetch(
+                    'recipes',
+                    queryset=Recipe.objects.only(
+                        'id', 'name', 'image', 'cooking_time', 'author'
+                    ) if is_expanded(context, 'recipes')
+                    else Recipe.objects.only('id', 'author')
+                ))
+            single_page = self.paginate_queryset(page_users)
+            serializer = SubscriptionsSerializer(
+                single_page,
+                many=True,
+                context=context
+            )
+            return self.get_paginated_response(serializer.data)
+
+        return conditional_response(
+            request,
+            get_etag(
+                request,
+                (users, Recipe.objects.filter(author__in=users))
+            ),
+            render
         )
-        single_page = self.paginate_queryset(users)
-        serializer = SubscriptionsSerializer(
-            single_page,
-            many=True,
-            context={"request": request, "recipes_limit": recipes_limit}
-        )
-        return self.get_paginated_response(serializer.data)
 
     @action(detail=True,
             methods=['POST'],
@@ -181,7 +258,8 @@ class UserViewSet(ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(SparseFieldsetsViewMixin, ConditionalGetMixin,
+                    ModelViewSet):
     """
     Вьюсет для рецептов.
     GET-запрос - получение списка рецептов.
@@ -196,12 +274,42 @@ class RecipeViewSet(ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeViewSetFilter
     http_method_names = ['get', 'post', 'delete', 'patch']
+    # Запись рецепта декодирует картинку, скачивание рисует PDF.
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'download_shopping_cart': 'shopping_cart_pdf',
+        'enqueue_shopping_cart': 'shopping_cart_pdf',
+    }
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
-            return RecipeReadSerializer
+            return RecipeFastReadSerializer
         return RecipeCreateSerializer
 
+    def paginate_queryset(self, queryset):
+        if self.action != 'list':
+            return super().paginate_queryset(queryset)
+        columns = get_recipe_columns(self.get_serializer_context())
+        page = super().paginate_queryset(queryset.values_list(*columns))
+        if page is None:
+            return None
+        return [RecipeRow(**dict(zip(columns, row))) for row in page]
+
+    def get_counted_sources(self, queryset):
+        # Теги и ингредиенты выводятся в рецептах: переименование
+        # двигает MAX(updated_at), удаление - COUNT(*).
+        return (queryset, Tag.objects.all(), Ingredient.objects.all())
+
+    def get_latest_sources(self, queryset):
+        # Данные авторов выводятся в рецептах, учитываются только
+        # авторы рецептов из выборки.
+        return (
+            User.objects.filter(
+                pk__in=queryset.order_by().values('author')
+            ),
+        )
+
     @action(detail=True,
             methods=['POST'],
             url_path=URL_PATH_FAVORITE,
@@ -266,8 +374,154 @@ class RecipeViewSet(ModelViewSet):
         user = User.objects.get(id=self.request.user.pk)
         if user.shoppingcart_user.exists():
             unique_ingredients = get_shopping_cart_ingredients(request.user)
-            return draw_pdf_file(unique_ingredients=unique_ingredients)
+            with pdf_render_limiter:
+                return draw_pdf_file(unique_ingredients=unique_ingredients)
         return Response(
             {'message': 'Список покупок пользователя пуст!'},
             status=status.HTTP_404_NOT_FOUND
         )
+
+    @download_shopping_cart.mapping.post
+    def enqueue_shopping_cart(self, request, *args, **kwargs):
+        """
+        POST-запрос по download_shopping_cart - поставить формирование
+        списка покупок в очередь, готовый файл скачивается по id задания.
+        """
+        if not request.user.shoppingcart_user.exists():
+            return Response(
+                {'message': 'Список покупок пользователя пуст!'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        job = enqueue_shopping_list_job(request.user)
+        location = reverse(
+            'recipes-shopping_list_job',
+            kwargs={'job_id': job.pk},
+            request=request
+        )
+        return Response(
+            ShoppingListJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': location}
+        )
+
+    @action(detail=False,
+            methods=['GET'],
+            url_path=URL_PATH_SHOPPING_LIST_JOB,
+            url_name='shopping_list_job',
+            permission_classes=(IsAuthenticated,))
+    def shopping_list_job(self, request, job_id, *args, **kwargs):
+        """GET-запрос по id задания - статус формирования списка покупок."""
+        job = get_object_or_404(ShoppingListJob, pk=job_id, user=request.user)
+        return Response(ShoppingListJobSerializer(job).data)
+
+    @action(detail=False,
+            methods=['GET'],
+            url_path=URL_PATH_SHOPPING_LIST_JOB_DOWNLOAD,
+            url_name='shopping_list_job_download',
+            permission_classes=(IsAuthenticated,))
+    def shopping_list_job_download(self, request, job_id, *args, **kwargs):
+        """GET-запрос по id задания - скачать готовый список покупок."""
+        job = get_object_or_404(ShoppingListJob, pk=job_id, user=request.user)
+        if job.status != ShoppingListJob.DONE:
+            return Response(
+                {'message': 'Список покупок еще не готов!'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return file_response(
+            job.file,
+            filename=SHOPPING_LIST_FILENAME,
+            as_attachment=True
+        )
+
+    @action(detail=False,
+            methods=['GET'],
+            url_path=URL_PATH_FEED,
+            url_name=URL_PATH_FEED,
+            permission_classes=(IsAuthenticated,))
+    def feed(self, request, *args, **kwargs):
+        """GET-запрос по feed - новые рецепты авторов из подписок."""
+        if settings.FEED_FANOUT_ENABLED:
+            paginator = TimelinePagination()
+            entries = paginator.paginate_queryset(
+                get_timeline_feed(request.user).select_related('recipe'),
+                request,
+                view=self
+            )
+            recipes = [entry.recipe for entry in entries]
+        else:
+            paginator = FeedPagination()
+            recipes = paginator.paginate_queryset(
+                get_pull_feed(request.user),
+                request,
+                view=self
+            )
+        serializer = RecipeFastReadSerializer(
+            recipes,
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True,
+            methods=['GET'],
+            url_path=URL_PATH_SIMILAR,
+            url_name=URL_PATH_SIMILAR)
+    def similar(self, request, *args, **kwargs):
+        """GET-запрос по id и similar - рецепты с похожими ингредиентами."""
+        recipe = get_object_or_404(Recipe, pk=kwargs['pk'])
+        return self.get_recipes_response(get_similar_recipe_ids(
+            recipe.pk,
+            self.get_limit(SIMILAR_RECIPES_LIMIT, SIMILAR_RECIPES_MAX_LIMIT)
+        ))
+
+    @action(detail=False,
+            methods=['GET'],
+            url_path=URL_PATH_RECOMMENDED,
+            url_name=URL_PATH_RECOMMENDED,
+            permission_classes=(IsAuthenticated,))
+    def recommended(self, request, *args, **kwargs):
+        """
+        GET-запрос по recommended - рецепты, которые добавляют
+        пользователи с похожим избранным.
+        """
+        return self.get_recipes_response(get_recommended_recipe_ids(
+            request.user,
+            self.get_limit(RECOMMENDATIONS_LIMIT, RECOMMENDATIONS_MAX_LIMIT)
+        ))
+
+    def get_limit(self, default, maximum):
+        """Размер выдачи из ?limit=, от 1 до maximum."""
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return default
+        return max(1, min(limit, maximum))
+
+    def get_recipes_response(self, recipe_ids):
+        """Рецепты в порядке recipe_ids через быстрый сериализатор."""
+        context = self.get_serializer_context()
+        rows = {
+            row.id: row for row in get_recipe_rows(
+                Recipe.objects.filter(pk__in=recipe_ids),
+                get_recipe_columns(context)
+            )
+        }
+        serializer = RecipeFastReadSerializer(
+            [rows[pk] for pk in recipe_ids if pk in rows],
+            many=True,
+            context=context
+        )
+        return Response(serializer.data)
+
+    @action(detail=False,
+            methods=['GET'],
+            url_path=URL_PATH_SHOPPING_LIST,
+            url_name=URL_PATH_SHOPPING_LIST,
+            permission_classes=(IsAuthenticated,))
+    def shopping_list(self, request, *args, **kwargs):
+        """GET-запрос по shopping_list - список покупок в JSON."""
+        serializer = ShoppingListSerializer(
+            get_shopping_cart_ingredients(request.user),
+            many=True
+        )
+        return Response(serializer.data)
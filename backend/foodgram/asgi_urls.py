@@ -0,0 +1,10 @@
+from django.urls import include, path
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+# Для ASGI горячие эндпоинты чтения обслуживаются асинхронными
+# представлениями, остальные маршруты совпадают с foodgram.urls.
+urlpatterns = [
+    path('api/', include('api.async_urls')),
+    *wsgi_urlpatterns,
+]
@@ -52,6 +52,28 @@ URL_PATH_SHOPPING_CART = 'shopping_cart'
 
 URL_PATH_DOWNLOAD_SHOPPING_CART = 'download_shopping_cart'
 
+URL_PATH_SHOPPING_LIST = 'shopping_list'
+
+URL_PATH_FEED = 'feed'
+
+URL_PATH_SIMILAR = 'similar'
+
+URL_PATH_RECOMMENDED = 'recommended'
+
+URL_PATH_SHOPPING_LIST_JOB = r'shopping_list_jobs/(?P<job_id>\d+)'
+
+URL_PATH_SHOPPING_LIST_JOB_DOWNLOAD = (
+    r'shopping_list_jobs/(?P<job_id>\d+)/download'
+)
+
+QUERY_PARAM_FIELDS = 'fields'
+
+QUERY_PARAM_EXPAND = 'expand'
+
+QUERY_PARAM_PROFILE = '_profile'
+
+QUERY_PARAM_PROFILE_FORMAT = '_profile_format'
+
 LENGTH_FOR_NAME = 200
 
 LENGTH_FOR_TEXT = 1024
@@ -63,3 +85,76 @@ LENGTH_FOR_MEASUREMENT_UNIT = 10
 LENGTH_FOR_USERNAME = 150
 
 LENGTH_FOR_EMAIL = 128
+
+LENGTH_FOR_JOB_STATUS = 10
+
+FUZZY_SEARCH_LIMIT = 20
+
+# С какого числа строк в таблице списки админки показывают
+# оценку количества из статистики PostgreSQL вместо COUNT(*).
+ADMIN_ESTIMATED_COUNT_MIN = 100000
+
+FUZZY_SEARCH_THRESHOLD = 0.6
+
+# MinHash-сигнатура рецепта: SIMILAR_RECIPES_BANDS полос
+# по SIMILAR_RECIPES_ROWS значений, каждая полоса дает одну LSH-корзину.
+# При 20 x 3 рецепты с коэффициентом Жаккара 0.3 попадают в общую
+# корзину с вероятностью ~0.42, с коэффициентом 0.5 - ~0.93.
+SIMILAR_RECIPES_BANDS = 20
+
+SIMILAR_RECIPES_ROWS = 3
+
+SIMILAR_RECIPES_SEED = 20240601
+
+# Сколько кандидатов из общих корзин переранжируется по точному Жаккару.
+SIMILAR_RECIPES_CANDIDATES = 200
+
+SIMILAR_RECIPES_LIMIT = 10
+
+SIMILAR_RECIPES_MAX_LIMIT = 50
+
+# Сколько соседей каждого рецепта хранит модель рекомендаций.
+RECOMMENDATIONS_NEIGHBORS = 20
+
+# Вес рецепта из списка покупок относительно рецепта из избранного.
+RECOMMENDATIONS_CART_WEIGHT = 0.5
+
+RECOMMENDATIONS_LIMIT = 10
+
+RECOMMENDATIONS_MAX_LIMIT = 50
+
+# Задание в статусе running дольше этого времени (в секундах)
+# считается брошенным и снова выдается воркерам.
+SHOPPING_LIST_JOB_TIMEOUT = 300
+
+# Завершенные задания и их PDF хранятся столько секунд, затем
+# удаляются воркерами раз в SHOPPING_LIST_JOB_CLEANUP_INTERVAL секунд.
+SHOPPING_LIST_JOB_TTL = 24 * 60 * 60
+
+SHOPPING_LIST_JOB_CLEANUP_INTERVAL = 60 * 60
+
+# Сколько строк pstats и запросов БД выводит профилирование запроса.
+PROFILING_STATS_LIMIT = 60
+
+PROFILING_MAX_QUERIES = 500
+
+# Через сколько секунд повторить профилирование, если все места заняты.
+PROFILING_RETRY_AFTER = 5
+
+# Сколько отпечатков запросов с записанным планом EXPLAIN помнит процесс.
+SLOW_LOG_EXPLAINED_MAX_SIZE = 10000
+
+# Совместимые единицы измерения: единица -> (базовая единица, множитель).
+UNIT_CONVERSIONS = {
+    'кг': ('г', 1000),
+    'л': ('мл', 1000),
+    'ст. л.': ('ч. л.', 3),
+}
+
+# Типы ответов, которые сжимает CompressionMiddleware (по префиксу).
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'text/',
+)
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from rest_framework.authentication import get_authorization_header
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import choose_replica, read_alias
+
+PIN_PRIMARY_COOKIE = 'db_pin_primary'
+TOKEN_KEYWORD = b'token'
+
+
+def get_token_key(request):
+    """Ключ токена из заголовка Authorization или None."""
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != TOKEN_KEYWORD:
+        return None
+    try:
+        return auth[1].decode()
+    except UnicodeError:
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Посредник выбора базы данных для чтения.
+    Безопасные запросы читают из реплики. После изменяющего запроса клиент
+    в течение DB_PIN_PRIMARY_SECONDS читает из основной БД, чтобы сразу
+    видеть свои изменения. Закрепление хранится в cookie и, для
+    авторизованного пользователя, в User.primary_pinned_until: клиенты
+    с токеном cookie не возвращают, и их закрепление проверяется по токену
+    запросом к основной БД.
+    Поддерживает как синхронную, так и асинхронную цепочку обработки.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = read_alias.set(self.get_read_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = read_alias.set(
+            await sync_to_async(self.get_read_alias)(request)
+        )
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return await sync_to_async(self.process_response)(request, response)
+
+    @classmethod
+    def get_read_alias(cls, request):
+        if (request.method not in SAFE_METHODS
+                or PIN_PRIMARY_COOKIE in request.COOKIES):
+            return None
+        alias = choose_replica()
+        if alias is None or cls.is_token_pinned(request):
+            return None
+        return alias
+
+    @staticmethod
+    def is_token_pinned(request):
+        key = get_token_key(request)
+        if key is None:
+            return False
+        return get_user_model().objects.using(DEFAULT_DB_ALIAS).filter(
+            auth_token__key=key,
+            primary_pinned_until__gt=timezone.now()
+        ).exists()
+
+    @staticmethod
+    def process_response(request, response):
+        if request.method in SAFE_METHODS:
+            return response
+        response.set_cookie(
+            PIN_PRIMARY_COOKIE,
+            '1',
+            max_age=settings.DB_PIN_PRIMARY_SECONDS,
+            httponly=True,
+            samesite='Lax',
+        )
+        user = getattr(request, 'user', None)
+        if (settings.DB_REPLICA_ALIASES
+                and user is not None and user.is_authenticated):
+            get_user_model().objects.filter(pk=user.pk).update(
+                primary_pinned_until=timezone.now() + timedelta(
+                    seconds=settings.DB_PIN_PRIMARY_SECONDS
+                )
+            )
+        return response
@@ -0,0 +1,68 @@
+from django.db import migrations
+from django.db.models import Index
+
+
+class PostgresOnlyMixin:
+    """
+    Выполняет операцию миграции только на PostgreSQL.
+    Состояние моделей меняется на любой БД, поэтому на SQLite
+    миграции применяются без специфичных для PostgreSQL индексов.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+
+class PostgresOnlyAddIndex(PostgresOnlyMixin, migrations.AddIndex):
+    """Добавляет индекс только на PostgreSQL (GIN, GiST и т.п.)."""
+
+
+class AlterForeignKeyIndex(migrations.AlterField):
+    """
+    Меняет только db_index у ForeignKey: индекс удаляется или создается
+    без пересоздания ограничения внешнего ключа, которое AlterField
+    проверяет заново по всей таблице.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        self.alter_index(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        self.alter_index(app_label, schema_editor, from_state, to_state)
+
+    def alter_index(self, app_label, schema_editor, from_state, to_state):
+        to_model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(
+            schema_editor.connection.alias, to_model
+        ):
+            return
+        from_model = from_state.apps.get_model(app_label, self.model_name)
+        old_field = from_model._meta.get_field(self.name)
+        new_field = to_model._meta.get_field(self.name)
+        if old_field.db_index and not new_field.db_index:
+            for index_name in schema_editor._constraint_names(
+                from_model,
+                [old_field.column],
+                index=True,
+                type_=Index.suffix
+            ):
+                schema_editor.execute(
+                    schema_editor._delete_index_sql(from_model, index_name)
+                )
+        elif new_field.db_index and not old_field.db_index:
+            schema_editor.execute(
+                schema_editor._create_index_sql(to_model, fields=[new_field])
+            )
@@ -0,0 +1,172 @@
+import os
+import threading
+
+import psycopg2
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+from psycopg2.pool import ThreadedConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    ThreadedConnectionPool с ожиданием свободного соединения.
+    Сам пул при исчерпании сразу бросает PoolError, поэтому выдача
+    ограничена семафором на MAX_SIZE мест: поток ждет освобождения
+    соединения до timeout секунд и только потом получает ошибку.
+    """
+
+    def __init__(self, min_size, max_size, timeout, **conn_params):
+        self.timeout = timeout
+        self._pool = ThreadedConnectionPool(min_size, max_size, **conn_params)
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                'Нет свободного соединения в пуле '
+                f'за {self.timeout} с.'
+            )
+        try:
+            return self._pool.getconn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection, close=False):
+        try:
+            self._pool.putconn(connection, close=close)
+        finally:
+            self._slots.release()
+
+    def replace(self, connection):
+        """Закрывает сломанное соединение и выдает новое на его место."""
+        try:
+            self._pool.putconn(connection, close=True)
+            return self._pool.getconn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+
+def get_pool(alias, conn_params, pool_settings):
+    """
+    Возвращает пул соединений для алиаса базы данных.
+    Пулы привязаны к процессу: после fork воркера создается новый пул,
+    чтобы процессы не делили сокеты соединений.
+    """
+    key = (alias, os.getpid())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                pool_settings.get('MIN_SIZE', 1),
+                pool_settings.get('MAX_SIZE', 10),
+                pool_settings.get('TIMEOUT', 10),
+                **conn_params
+            )
+            _pools[key] = pool
+    return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Бэкенд PostgreSQL с проверкой постоянных соединений
+    и необязательным пулом соединений внутри процесса.
+    -CONN_HEALTH_CHECKS: перед первым запросом в рамках HTTP-запроса
+    переиспользуемое соединение проверяется и при обрыве открывается заново.
+    -POOL: соединения берутся из ThreadedConnectionPool и возвращаются в него
+    вместо закрытия, что полезно для потоковых и асинхронных воркеров.
+    Если пул занят, поток ждет соединения до POOL['TIMEOUT'] секунд.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool_settings(self):
+        pool_settings = self.settings_dict.get('POOL') or {}
+        if pool_settings.get('ENABLED'):
+            return pool_settings
+        return None
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool_settings = self.pool_settings
+        if pool_settings is None:
+            return super().get_new_connection(conn_params)
+        pool = get_pool(self.alias, conn_params, pool_settings)
+        connection = pool.getconn()
+        try:
+            while self.health_check_enabled and not self._ping(connection):
+                connection = pool.replace(connection)
+            options = self.settings_dict['OPTIONS']
+            self.isolation_level = options.get(
+                'isolation_level',
+                connection.isolation_level
+            )
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+            psycopg2.extras.register_default_jsonb(
+                conn_or_curs=connection,
+                loads=lambda x: x
+            )
+        except psycopg2.Error:
+            pool.putconn(connection, close=True)
+            raise
+        return connection
+
+    def connect(self):
+        # Новое соединение не нуждается в проверке, а сама проверка
+        # внутри connect() открыла бы транзакцию до установки autocommit.
+        self.health_check_done = True
+        super().connect()
+
+    @async_unsafe
+    def ensure_connection(self):
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None
+                or not self.health_check_enabled
+                or self.health_check_done
+                or self.in_atomic_block):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def _close(self):
+        pool_settings = self.pool_settings
+        if self.connection is None or pool_settings is None:
+            return super()._close()
+        pool = get_pool(
+            self.alias,
+            self.get_connection_params(),
+            pool_settings
+        )
+        with self.wrap_database_errors:
+            pool.putconn(self.connection, close=self.errors_occurred)
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
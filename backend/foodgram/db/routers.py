@@ -0,0 +1,32 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+def choose_replica():
+    """Выбирает реплику для чтения или None, если реплики не настроены."""
+    if not settings.DB_REPLICA_ALIASES:
+        return None
+    return random.choice(settings.DB_REPLICA_ALIASES)
+
+
+class ReplicaRouter:
+    """
+    Роутер баз данных.
+    Чтение направляется в реплику, выбранную для текущего запроса
+    посредником ReplicaRoutingMiddleware, запись всегда идет в основную БД.
+    Вне HTTP-запросов (команды, shell) все запросы идут в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,107 @@
+import gzip
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from foodgram.constants import COMPRESSIBLE_CONTENT_TYPES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def get_accepted_encodings(header):
+    """Кодировки из Accept-Encoding с их весами q."""
+    encodings = {}
+    for item in header.split(','):
+        name, *params = item.split(';')
+        weight = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name.strip():
+            encodings[name.strip().lower()] = weight
+    return encodings
+
+
+def choose_encoding(header):
+    """
+    Выбирает сжатие по Accept-Encoding: кодировку с большим весом,
+    при равных весах - br. Возвращает None, если сжатие не принимается.
+    """
+    accepted = get_accepted_encodings(header)
+    available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    candidates = [
+        (accepted.get(encoding, accepted.get('*', 0.0)), -index, encoding)
+        for index, encoding in enumerate(available)
+    ]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(
+        content,
+        compresslevel=settings.GZIP_COMPRESS_LEVEL,
+        mtime=0
+    )
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжатие ответов brotli или gzip по Accept-Encoding клиента.
+    Сжимаются текстовые ответы (JSON, HTML) не меньше
+    COMPRESSION_MIN_SIZE байт; потоковые ответы (файлы) и уже сжатые
+    ответы не трогаются. ETag сжатого ответа становится слабым,
+    условные запросы сравнивают его без учета W/.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith(
+                COMPRESSIBLE_CONTENT_TYPES
+            )
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class AsgiUrlconfMiddleware(MiddlewareMixin):
+    """
+    Запросы, пришедшие через ASGI, разрешаются по ASGI_ROOT_URLCONF
+    (асинхронные представления горячих эндпоинтов чтения), запросы
+    WSGI - по ROOT_URLCONF. Выбор сделан по типу запроса, а не по
+    переменной окружения, поэтому не зависит от того, кто и когда
+    загрузил настройки.
+    """
+
+    def process_request(self, request):
+        if isinstance(request, ASGIRequest):
+            request.urlconf = settings.ASGI_ROOT_URLCONF
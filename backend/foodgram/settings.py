@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -33,17 +34,25 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.AsgiUrlconfMiddleware',
+    'api.slow_log.SlowLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.middleware.CompressionMiddleware',
+    'foodgram.db.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
 
+# Маршруты запросов через ASGI, см. foodgram.middleware.AsgiUrlconfMiddleware.
+ASGI_ROOT_URLCONF = 'foodgram.asgi_urls'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -62,18 +71,63 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+DB_POOL_ENABLED = bool(strtobool(os.getenv('DB_POOL_ENABLED', 'False')))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+
+# Потоки чтения ASGI держат по соединению с БД: по умолчанию их столько же,
+# сколько соединений в пуле, а при включенном пуле больше быть не может.
+ASGI_READ_THREADS = int(os.getenv('ASGI_READ_THREADS', DB_POOL_MAX_SIZE))
+if DB_POOL_ENABLED:
+    ASGI_READ_THREADS = min(ASGI_READ_THREADS, DB_POOL_MAX_SIZE)
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram.db.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # При включенном пуле соединения переиспользует пул,
+        # а Django возвращает их в пул в конце каждого запроса.
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_ENABLED else int(os.getenv('DB_CONN_MAX_AGE', 60))
+        ),
+        'CONN_HEALTH_CHECKS': bool(
+            strtobool(os.getenv('DB_CONN_HEALTH_CHECKS', 'True'))
+        ),
+        'POOL': {
+            'ENABLED': DB_POOL_ENABLED,
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': DB_POOL_MAX_SIZE,
+            # Сколько секунд ждать свободного соединения, когда пул занят.
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        },
     }
 }
 
+# Реплики для чтения: DB_REPLICA_HOSTS=replica1,replica2.
+# DB_REPLICA_NAME позволяет указать другую БД, например для локальной
+# проверки маршрутизации на двух базах одного сервера.
+DB_REPLICA_ALIASES = []
+
+for index, host in enumerate(filter(None, os.getenv(
+    'DB_REPLICA_HOSTS', ''
+).split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': host.strip(),
+        'POOL': dict(DATABASES['default']['POOL']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DB_REPLICA_ALIASES.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db.routers.ReplicaRouter']
+
+DB_PIN_PRIMARY_SECONDS = int(os.getenv('DB_PIN_PRIMARY_SECONDS', 5))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -121,10 +175,121 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
     ),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 6
+    'PAGE_SIZE': 6,
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.ScopedTokenBucketThrottle',
+    ),
+    # Частоты областей из throttle_scopes вьюсетов, на процесс.
+    'DEFAULT_THROTTLE_RATES': {
+        'recipe_write': os.getenv('THROTTLE_RECIPE_WRITE', '30/min'),
+        'shopping_cart_pdf': os.getenv('THROTTLE_SHOPPING_CART_PDF', '6/min'),
+        'user_create': os.getenv('THROTTLE_USER_CREATE', '10/hour'),
+        'set_password': os.getenv('THROTTLE_SET_PASSWORD', '5/min'),
+    },
+    # Сколько прокси перед приложением: IP анонимного клиента
+    # для ограничения частоты берется из X-Forwarded-For.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 0)),
 }
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
 }
+
+USER_FLAGS_CACHE_MAX_BYTES = int(
+    os.getenv('USER_FLAGS_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+)
+
+USER_FLAGS_MAX_FILTER_IDS = int(os.getenv('USER_FLAGS_MAX_FILTER_IDS', 1000))
+
+# Лента подписок читается из FeedEntry, заполняемой при публикации рецепта,
+# вместо запроса по подпискам. Включается для пользователей с большим
+# числом подписок, существующие ленты собираются командой rebuild_feeds.
+FEED_FANOUT_ENABLED = bool(
+    strtobool(os.getenv('FEED_FANOUT_ENABLED', 'False'))
+)
+
+FEED_FANOUT_BATCH_SIZE = int(os.getenv('FEED_FANOUT_BATCH_SIZE', 1000))
+
+# Ответы меньше этого размера (в байтах) не сжимаются.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+
+GZIP_COMPRESS_LEVEL = int(os.getenv('GZIP_COMPRESS_LEVEL', 6))
+
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+
+# Файлы после проверки прав отдает nginx по X-Accel-Redirect
+# из internal-локации; без nginx файлы отдает Django.
+FILE_ACCEL_REDIRECT_ENABLED = bool(
+    strtobool(os.getenv('FILE_ACCEL_REDIRECT_ENABLED', 'False'))
+)
+
+FILE_ACCEL_REDIRECT_LOCATION = os.getenv(
+    'FILE_ACCEL_REDIRECT_LOCATION',
+    '/protected/media/'
+)
+
+# Сколько корзин токенов ограничения частоты хранит процесс.
+THROTTLE_BUCKETS_MAX_SIZE = int(os.getenv('THROTTLE_BUCKETS_MAX_SIZE', 100000))
+
+# Одновременных отрисовок PDF в процессе; остальные запросы получают
+# 503 с Retry-After (в секундах) вместо ожидания свободного потока.
+PDF_RENDER_CONCURRENCY = int(os.getenv('PDF_RENDER_CONCURRENCY', 2))
+
+PDF_RENDER_RETRY_AFTER = int(os.getenv('PDF_RENDER_RETRY_AFTER', 5))
+
+# Профилирование запросов персонала по ?_profile=cprofile|sql:
+# не чаще PROFILING_RATE на пользователя и не больше
+# PROFILING_CONCURRENCY профилей одновременно в процессе.
+PROFILING_ENABLED = bool(strtobool(os.getenv('PROFILING_ENABLED', 'True')))
+
+PROFILING_RATE = os.getenv('PROFILING_RATE', '10/min')
+
+PROFILING_CONCURRENCY = int(os.getenv('PROFILING_CONCURRENCY', 1))
+
+# Журнал медленных HTTP-запросов и запросов к БД (строки JSON
+# в SLOW_LOG_FILE с ротацией по размеру). Для PostgreSQL к первому
+# медленному выполнению запроса в процессе добавляется план EXPLAIN.
+SLOW_LOG_ENABLED = bool(strtobool(os.getenv('SLOW_LOG_ENABLED', 'False')))
+
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', 500))
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 100))
+
+SLOW_LOG_EXPLAIN = bool(strtobool(os.getenv('SLOW_LOG_EXPLAIN', 'True')))
+
+SLOW_LOG_FILE = os.getenv('SLOW_LOG_FILE', os.path.join(BASE_DIR, 'slow.log'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json_line': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_log': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_LOG_FILE,
+            'maxBytes': int(os.getenv('SLOW_LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            'backupCount': int(os.getenv('SLOW_LOG_BACKUP_COUNT', 5)),
+            'delay': True,
+            'formatter': 'json_line',
+        },
+    },
+    'loggers': {
+        'foodgram.slow': {
+            'handlers': ['slow_log'] if SLOW_LOG_ENABLED else [],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
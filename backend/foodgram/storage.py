@@ -0,0 +1,45 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """
+    Хранилище, называющее файлы по SHA-256 содержимого:
+    <каталог upload_to>/ab/cd/abcd...<расширение>.
+    Одинаковые файлы хранятся один раз и делятся между записями,
+    поэтому файлы не удаляются вместе с записями - неиспользуемые
+    удаляет команда collect_media_garbage. Содержимое по имени
+    не меняется, и nginx отдает такие файлы с бессрочным кэшем.
+    """
+
+    def get_hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory,
+            hexdigest[:2],
+            hexdigest[2:4],
+            hexdigest + extension
+        )
+
+    def _save(self, name, content):
+        name = self.get_hashed_name(name, content)
+        if self.exists(name):
+            # Свежая дата изменения защищает файл от удаления
+            # collect_media_garbage, пока запись с ним не сохранена.
+            os.utime(self.path(name))
+            return name
+        saved_name = super()._save(name, content)
+        if saved_name != name:
+            # Тот же файл параллельно сохранил другой запрос.
+            self.delete(saved_name)
+        return name
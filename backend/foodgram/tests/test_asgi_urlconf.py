@@ -0,0 +1,26 @@
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase
+from django.urls import resolve
+
+from api.async_views import tag_list
+from foodgram.middleware import AsgiUrlconfMiddleware
+
+
+def get_urlconf(request):
+    AsgiUrlconfMiddleware(lambda request: HttpResponse())(request)
+    return getattr(request, 'urlconf', None)
+
+
+class AsgiUrlconfMiddlewareTests(SimpleTestCase):
+    """Маршруты выбираются по типу запроса, а не по окружению."""
+
+    def test_asgi_request_uses_async_routes(self):
+        request = AsyncRequestFactory().get('/api/tags/')
+        urlconf = get_urlconf(request)
+        self.assertEqual(urlconf, 'foodgram.asgi_urls')
+        self.assertIs(resolve('/api/tags/', urlconf).func, tag_list)
+
+    def test_wsgi_request_keeps_root_urlconf(self):
+        request = RequestFactory().get('/api/tags/')
+        self.assertIsNone(get_urlconf(request))
+        self.assertIsNot(resolve('/api/tags/').func, tag_list)
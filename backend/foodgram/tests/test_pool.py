@@ -0,0 +1,42 @@
+import threading
+import time
+
+import psycopg2
+from django.db import connection
+from django.test import SimpleTestCase
+
+from foodgram.db.postgresql.base import ConnectionPool
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Пул ждет освобождения соединения не дольше timeout."""
+    databases = {'default'}
+
+    def setUp(self):
+        self.pool = ConnectionPool(
+            1, 1, 0.2, **connection.get_connection_params()
+        )
+        self.addCleanup(self.pool._pool.closeall)
+
+    def test_exhausted_pool_times_out(self):
+        taken = self.pool.getconn()
+        start = time.monotonic()
+        with self.assertRaises(psycopg2.OperationalError):
+            self.pool.getconn()
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.pool.putconn(taken)
+        self.pool.putconn(self.pool.getconn())
+
+    def test_waiter_gets_released_connection(self):
+        self.pool.timeout = 5
+        taken = self.pool.getconn()
+        received = []
+        waiter = threading.Thread(
+            target=lambda: received.append(self.pool.getconn())
+        )
+        waiter.start()
+        time.sleep(0.1)
+        self.pool.putconn(taken)
+        waiter.join(5)
+        self.assertEqual(received, [taken])
+        self.pool.putconn(taken)
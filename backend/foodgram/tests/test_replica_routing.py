@@ -0,0 +1,111 @@
+import unittest
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.tests.utils import create_recipe, create_user, get_token_client
+from foodgram.db.middleware import (
+    PIN_PRIMARY_COOKIE,
+    ReplicaRoutingMiddleware
+)
+from foodgram.db.routers import read_alias
+from users.models import User
+
+REPLICA = 'replica_0'
+HAS_REPLICA = REPLICA in settings.DATABASES
+
+
+@override_settings(DB_REPLICA_ALIASES=[REPLICA])
+class ReplicaRoutingMiddlewareTests(TestCase):
+    """Выбор базы для чтения без обращений к самой реплике."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('writer')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.aliases = []
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.aliases.append(read_alias.get())
+        return HttpResponse()
+
+    def get_alias(self, request):
+        self.middleware(request)
+        return self.aliases[-1]
+
+    def test_safe_request_reads_from_replica(self):
+        self.assertEqual(self.get_alias(self.factory.get('/')), REPLICA)
+
+    def test_write_request_uses_primary_and_pins(self):
+        request = self.factory.post('/')
+        request.user = self.user
+        response = self.middleware(request)
+        self.assertIsNone(self.aliases[-1])
+        self.assertIn(PIN_PRIMARY_COOKIE, response.cookies)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.primary_pinned_until, timezone.now())
+
+    def test_pin_cookie_reads_from_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[PIN_PRIMARY_COOKIE] = '1'
+        self.assertIsNone(self.get_alias(request))
+
+    def test_pinned_token_reads_from_primary(self):
+        auth = f'Token {self.token.key}'
+        User.objects.filter(pk=self.user.pk).update(
+            primary_pinned_until=timezone.now() + timedelta(seconds=5)
+        )
+        self.assertIsNone(
+            self.get_alias(self.factory.get('/', HTTP_AUTHORIZATION=auth))
+        )
+        User.objects.filter(pk=self.user.pk).update(
+            primary_pinned_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(
+            self.get_alias(self.factory.get('/', HTTP_AUTHORIZATION=auth)),
+            REPLICA
+        )
+
+
+@unittest.skipUnless(
+    HAS_REPLICA,
+    'Нужна реплика: DB_REPLICA_HOSTS=<хост основной БД>.'
+)
+class ReplicaRoutingTests(TestCase):
+    """
+    Маршрутизация на двух подключениях: реплика в тестах - зеркало
+    основной БД (TEST MIRROR), по ее подключению видно, куда ушло чтение.
+    """
+    databases = {'default', REPLICA} if HAS_REPLICA else {'default'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('writer')
+        cls.recipe = create_recipe(create_user('author'), 'Плов')
+
+    def get_replica_queries(self, client, url):
+        client.cookies.clear()
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            client.get(url)
+        return len(queries)
+
+    def test_token_client_reads_own_write_from_primary(self):
+        client = get_token_client(self.user)
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.assertGreater(self.get_replica_queries(client, url), 0)
+        client.post(f'{url}favorite/')
+        self.assertEqual(self.get_replica_queries(client, url), 0)
+        User.objects.filter(pk=self.user.pk).update(
+            primary_pinned_until=timezone.now()
+        )
+        self.assertGreater(self.get_replica_queries(client, url), 0)
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+from distutils.util import strtobool
+
+# Конфигурация gunicorn, все параметры задаются переменными окружения.
+# GUNICORN_WORKER_CLASS: sync, gthread или uvicorn (ASGI через foodgram.asgi).
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+worker_type = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:9090')
+
+worker_class = WORKER_CLASSES[worker_type]
+
+wsgi_app = (
+    'foodgram.asgi:application' if worker_type == 'uvicorn'
+    else 'foodgram.wsgi:application'
+)
+
+threads = int(os.getenv(
+    'GUNICORN_THREADS',
+    4 if worker_type == 'gthread' else 1
+))
+
+# Бюджет соединений с основной БД на один экземпляр приложения:
+# max_connections PostgreSQL за вычетом резерва (миграции, команды,
+# воркеры фоновых задач, администрирование), деленный на число реплик
+# приложения. Каждый поток воркера держит свое соединение
+# (CONN_MAX_AGE), под ASGI - каждый поток чтения и основной поток,
+# а пул ограничивает их числом DB_POOL_MAX_SIZE на процесс.
+db_max_connections = int(os.getenv('DB_MAX_CONNECTIONS', 100))
+db_reserved_connections = int(os.getenv('DB_RESERVED_CONNECTIONS', 10))
+app_replicas = int(os.getenv('APP_REPLICAS', 1))
+
+db_connection_budget = max(
+    1, (db_max_connections - db_reserved_connections) // app_replicas
+)
+
+# Те же переменные и значения по умолчанию, что в foodgram.settings.
+# Настройки Django здесь не импортируются: мастер-процесс загрузил бы
+# их раньше, чем приложение WSGI или ASGI.
+db_pool_enabled = bool(strtobool(os.getenv('DB_POOL_ENABLED', 'False')))
+db_pool_max_size = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+asgi_read_threads = int(os.getenv('ASGI_READ_THREADS', db_pool_max_size))
+
+worker_connections_count = (
+    asgi_read_threads + 1 if worker_type == 'uvicorn' else threads
+)
+if db_pool_enabled:
+    worker_connections_count = min(worker_connections_count, db_pool_max_size)
+
+# Больше воркеров, чем позволяет бюджет, не запускается: воркеры сверх
+# него получали бы отказ PostgreSQL в соединении под нагрузкой.
+max_workers = max(1, db_connection_budget // worker_connections_count)
+
+requested_workers = int(os.getenv(
+    'GUNICORN_WORKERS',
+    multiprocessing.cpu_count() * 2 + 1
+))
+
+workers = min(requested_workers, max_workers)
+
+# Django, DRF, reportlab и зарегистрированные шрифты загружаются один раз
+# в мастер-процессе и разделяются воркерами через copy-on-write.
+preload_app = bool(strtobool(os.getenv('GUNICORN_PRELOAD', 'True')))
+
+# Перезапуск воркеров ограничивает рост памяти, а jitter не дает
+# всем воркерам перезапуститься одновременно.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+
+def on_starting(server):
+    if requested_workers > workers:
+        server.log.warning(
+            'GUNICORN_WORKERS=%s превышает бюджет соединений с БД, '
+            'запускается %s воркеров.',
+            requested_workers,
+            workers,
+        )
+    server.log.info(
+        'Соединений с БД: до %s (%s воркеров по %s) из бюджета %s.',
+        workers * worker_connections_count,
+        workers,
+        worker_connections_count,
+        db_connection_budget,
+    )
+
+
+def when_ready(server):
+    """
+    Прогревает маршруты до fork, чтобы представления и сериализаторы
+    импортировались в мастер-процессе, и закрывает соединения с БД,
+    которые нельзя разделять между процессами.
+    """
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    connections.close_all()
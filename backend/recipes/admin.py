@@ -1,5 +1,13 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, IntegerField, OuterRef, Subquery
 from django.template.defaulttags import format_html
+from django.utils.functional import cached_property
+
+from foodgram.constants import ADMIN_ESTIMATED_COUNT_MIN
 
 from .models import (
     Favorite,
@@ -7,24 +15,118 @@ from .models import (
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingListJob,
+    ShoppingListItem,
     Subscriptions,
     Tag,
 )
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков больших таблиц: без фильтров и поиска число строк
+    берется из статистики PostgreSQL (pg_class.reltuples) вместо COUNT(*)
+    по всей таблице. Оценка используется, начиная с
+    ADMIN_ESTIMATED_COUNT_MIN строк, отфильтрованные списки считаются
+    точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if queryset.query.where or connection.vendor != 'postgresql':
+            return super().count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < ADMIN_ESTIMATED_COUNT_MIN:
+            return super().count
+        return int(row[0])
+
+
+class TagFilter(admin.SimpleListFilter):
+    """
+    Фильтр рецептов по тегу. В отличие от фильтра по полю tags,
+    не требует от changelist'а удаления дублей через EXISTS
+    по всей таблице рецептов: один тег дублей не дает.
+    """
+    title = 'Тег'
+    parameter_name = 'tag'
+
+    def lookups(self, request, model_admin):
+        return Tag.objects.values_list('slug', 'name')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(tags__slug=self.value())
+        return queryset
+
+
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     """Кастомный класс для регистрации модели ингредиентов в админке."""
     list_display = ('name', 'measurement_unit',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
     search_fields = ('name',)
 
 
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """
+    Виджет автодополнения, который берет выбранный объект из строки
+    формы (selected), а не отдельным запросом на каждую строку инлайна.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.selected is None or [str(item) for item in value] != [
+            str(self.selected.pk)
+        ]:
+            return super().optgroups(name, value, attr)
+        option = self.create_option(
+            name,
+            self.selected.pk,
+            self.choices.field.label_from_instance(self.selected),
+            True,
+            0
+        )
+        return [(None, [option], 0)]
+
+
+class RecipeIngredientForm(forms.ModelForm):
+    """Строка инлайна передает виджету уже загруженный ингредиент."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.ingredient_id is not None:
+            self.fields['ingredient'].widget.widget.selected = (
+                self.instance.ingredient
+            )
+
+
 class RecipeIngredientInline(admin.TabularInline):
     """Модель рецептов и ингредиентов для вставки в модель рецептов."""
     model = RecipeIngredient
+    form = RecipeIngredientForm
     extra = 0
     min_num = 1
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'ingredient',
+            'recipe'
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'ingredient':
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field, self.admin_site, using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Recipe)
@@ -32,10 +134,29 @@ class RecipeAdmin(admin.ModelAdmin):
     """Кастомный класс для регистрации модели рецептов в админке."""
     inlines = [RecipeIngredientInline]
     list_display = ('name', 'author', 'count_favourite_recipes', 'image_tag')
-    list_filter = ('author__username', 'name', 'tags')
+    list_filter = (TagFilter,)
+    list_select_related = ('author',)
     search_fields = ('name',)
     filter_horizontal = ('tags',)
+    autocomplete_fields = ('author',)
     readonly_fields = ['count_favourite_recipes', ]
+    # Полный COUNT по таблице для "показать все" не выполняется.
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        # Коррелированный подзапрос считается только для строк страницы,
+        # в отличие от Count с GROUP BY по всей таблице.
+        return super().get_queryset(request).annotate(
+            favorites_count=Subquery(
+                Favorite.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    count=Count('pk')
+                ).values('count'),
+                output_field=IntegerField()
+            )
+        )
 
     def image_tag(self, obj):
         if obj.image:
@@ -45,7 +166,7 @@ class RecipeAdmin(admin.ModelAdmin):
     image_tag.short_description = 'Изображение рецепта'
 
     def count_favourite_recipes(self, obj):
-        return obj.favorite_recipe.all().count()
+        return obj.favorites_count or 0
 
     count_favourite_recipes.short_description = ('Общее число добавлений'
                                                  ' рецепта в избранное')
@@ -54,25 +175,34 @@ class RecipeAdmin(admin.ModelAdmin):
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     """Админ-зона для модели рецептов и ингредиентов."""
-    list_display = ('recipe', 'ingredient',)
-    list_filter = ('recipe', 'ingredient',)
+    list_display = ('recipe', 'ingredient', 'amount',)
+    list_select_related = ('recipe', 'ingredient',)
     search_fields = ('recipe__name', 'ingredient__name')
+    autocomplete_fields = ('recipe', 'ingredient',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Favorite)
 class FavouriteAdmin(admin.ModelAdmin):
     """Кастомный класс для регистрации модели избранного в админке."""
     list_display = ('user', 'recipe',)
-    list_filter = ('recipe',)
+    list_select_related = ('user', 'recipe',)
     search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Subscriptions)
 class SubscriptionsAdmin(admin.ModelAdmin):
     """Кастомный класс для регистрации модели подписок в админке."""
     list_display = ('follower', 'following',)
-    list_filter = ('follower', 'following',)
+    list_select_related = ('follower', 'following',)
     search_fields = ('follower__username', 'following__username')
+    autocomplete_fields = ('follower', 'following',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Tag)
@@ -86,6 +216,39 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     """Кастомный класс для регистрации модели списка покупок в админке."""
-    list_display = ('user', 'recipe',)
-    list_filter = ('user', 'recipe',)
+    list_display = ('user', 'recipe', 'servings',)
+    list_select_related = ('user', 'recipe',)
     search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    """
+    Кастомный класс для регистрации материализованного списка покупок
+    в админке, только для просмотра.
+    """
+    list_display = ('user', 'ingredient', 'total',)
+    list_select_related = ('user', 'ingredient',)
+    search_fields = ('user__username', 'ingredient__name')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ShoppingListJob)
+class ShoppingListJobAdmin(admin.ModelAdmin):
+    """Кастомный класс для регистрации заданий на списки покупок в админке."""
+    list_display = ('pk', 'user', 'status', 'created_at', 'finished_at',)
+    list_filter = ('status',)
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    autocomplete_fields = ('user',)
+    readonly_fields = ('started_at', 'finished_at',)
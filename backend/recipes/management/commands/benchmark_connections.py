@@ -0,0 +1,97 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+MODES = {
+    'off': {'CONN_MAX_AGE': 0, 'POOL_ENABLED': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'POOL_ENABLED': False},
+    'pool': {'CONN_MAX_AGE': 0, 'POOL_ENABLED': True},
+}
+
+
+class Command(BaseCommand):
+    """
+    Замер количества запросов в секунду к GET /api/tags/
+    без переиспользования соединений, с постоянными соединениями
+    и с пулом соединений.
+    Запросы проходят через WSGI-обработчик Django целиком,
+    включая открытие и закрытие соединений по сигналам запроса.
+    """
+    help = 'Сравнивает режимы переиспользования соединений с БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/tags/')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=MODES.keys(),
+            default=list(MODES.keys())
+        )
+
+    def handle(self, *args, **options):
+        handler = WSGIHandler()
+        host = settings.ALLOWED_HOSTS[0]
+        for mode in options['modes']:
+            self.configure(MODES[mode])
+            self.request(handler, options['path'], host)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options['threads']) as executor:
+                statuses = list(executor.map(
+                    lambda _: self.request(handler, options['path'], host),
+                    range(options['requests'])
+                ))
+            elapsed = time.perf_counter() - started
+            errors = sum(
+                1 for status in statuses if not status.startswith('2')
+            )
+            self.stdout.write(
+                f'{mode}: {options["requests"] / elapsed:.1f} req/s, '
+                f'{elapsed:.2f} s, ошибок: {errors}'
+            )
+        connections.close_all()
+
+    @staticmethod
+    def configure(mode):
+        connections.close_all()
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            settings_dict['CONN_MAX_AGE'] = mode['CONN_MAX_AGE']
+            settings_dict.setdefault('POOL', {})
+            settings_dict['POOL']['ENABLED'] = mode['POOL_ENABLED']
+
+    @staticmethod
+    def request(handler, path, host):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': host,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        result = {}
+
+        def start_response(status, headers, exc_info=None):
+            result['status'] = status
+
+        response = handler(environ, start_response)
+        b''.join(response)
+        response.close()
+        return result['status']
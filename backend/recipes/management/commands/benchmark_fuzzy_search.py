@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.fuzzy import fuzzy_search
+from recipes.models import Ingredient, Recipe
+
+DEFAULT_TERMS = ('мор', 'морков', 'моркавь', 'ковь', 'сыр', 'пирог')
+
+MODELS = {
+    'ingredient': Ingredient,
+    'recipe': Recipe,
+}
+
+
+class Command(BaseCommand):
+    """
+    Сравнение текущего поиска по началу названия (istartswith)
+    с нечетким поиском по триграммам: среднее время запроса
+    и число найденных записей для каждого термина.
+    """
+    help = 'Сравнивает поиск по префиксу и нечеткий поиск по названию.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terms', nargs='+', default=DEFAULT_TERMS)
+        parser.add_argument(
+            '--model',
+            choices=MODELS.keys(),
+            default='ingredient'
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        for term in options['terms']:
+            prefix_time, prefix_rows = self.measure(
+                lambda: model.objects.filter(name__istartswith=term),
+                options['repeat']
+            )
+            fuzzy_time, fuzzy_rows = self.measure(
+                lambda: fuzzy_search(model.objects.all(), 'name', term),
+                options['repeat']
+            )
+            top = fuzzy_rows[0].name if fuzzy_rows else '-'
+            self.stdout.write(
+                f'{term}: префикс {prefix_time * 1000:.2f} ms '
+                f'({len(prefix_rows)} шт.), '
+                f'нечеткий {fuzzy_time * 1000:.2f} ms '
+                f'({len(fuzzy_rows)} шт., лучший: {top})'
+            )
+
+    @staticmethod
+    def measure(make_queryset, repeat):
+        rows = list(make_queryset())
+        started = time.perf_counter()
+        for _ in range(repeat):
+            rows = list(make_queryset())
+        return (time.perf_counter() - started) / repeat, rows
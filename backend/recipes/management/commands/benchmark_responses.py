@@ -0,0 +1,81 @@
+import gzip
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import RecipeFastReadSerializer, get_recipe_rows
+from foodgram.middleware import brotli
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Замер рендеринга и сжатия страницы рецептов.
+    Страница из --limit последних рецептов рендерится JSONRenderer
+    и FastJSONRenderer (вывод должен совпадать побайтно), затем
+    сжимается gzip и brotli с уровнями из настроек. Выводится
+    процессорное время (лучшее из --repeat) и размер ответа.
+    """
+    help = 'Сравнивает рендереры JSON и сжатие страницы рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = AnonymousUser()
+        data = RecipeFastReadSerializer(
+            get_recipe_rows(
+                Recipe.objects.order_by('-pub_date', '-id')[:options['limit']]
+            ),
+            many=True,
+            context={'request': request}
+        ).data
+        repeat = options['repeat']
+        expected = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != expected:
+            raise CommandError('Вывод рендереров расходится.')
+        self.stdout.write(
+            f'Рецептов: {len(data)}, JSON: {len(expected)} байт, '
+            f'orjson: {"да" if orjson else "нет"}.'
+        )
+        for name, renderer in (
+            ('JSONRenderer', JSONRenderer()),
+            ('FastJSONRenderer', FastJSONRenderer()),
+        ):
+            self.report(name, lambda: renderer.render(data), repeat)
+        compressors = [(
+            f'gzip {settings.GZIP_COMPRESS_LEVEL}',
+            lambda: gzip.compress(
+                expected,
+                compresslevel=settings.GZIP_COMPRESS_LEVEL,
+                mtime=0
+            )
+        )]
+        if brotli is not None:
+            compressors.append((
+                f'br {settings.BROTLI_QUALITY}',
+                lambda: brotli.compress(
+                    expected,
+                    quality=settings.BROTLI_QUALITY
+                )
+            ))
+        for name, compressor in compressors:
+            self.report(name, compressor, repeat)
+
+    def report(self, name, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.process_time()
+            result = func()
+            timings.append(time.process_time() - start)
+        self.stdout.write(
+            f'{name}: {min(timings) * 1000:.2f} мс CPU, '
+            f'{len(result)} байт'
+        )
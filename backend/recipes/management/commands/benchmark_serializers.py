@@ -0,0 +1,105 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import (
+    RecipeFastReadSerializer,
+    RecipeReadSerializer,
+    get_recipe_rows
+)
+from recipes.models import Recipe
+from users.models import User
+
+
+def normalize(recipes):
+    """
+    Приводит вывод к сравнимому виду: порядок ингредиентов
+    в RecipeReadSerializer не задан, поэтому они сортируются по id.
+    """
+    return [
+        {
+            **recipe,
+            'ingredients': sorted(
+                recipe['ingredients'],
+                key=lambda ingredient: ingredient['id']
+            ),
+        }
+        for recipe in recipes
+    ]
+
+
+class Command(BaseCommand):
+    """
+    Сверка и замер быстрого сериализатора рецептов.
+    Вывод RecipeFastReadSerializer для --limit последних рецептов
+    сравнивается с выводом RecipeReadSerializer, затем оба выполняются
+    --repeat раз, и выводится лучшее число рецептов в секунду
+    вместе с запросами к БД. Для RecipeReadSerializer связанные данные
+    выбираются через select_related и prefetch_related.
+    """
+    help = 'Сравнивает вывод и скорость сериализаторов рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--user', type=int, default=None)
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = (
+            User.objects.get(pk=options['user']) if options['user']
+            else AnonymousUser()
+        )
+        context = {'request': request}
+        recipes = Recipe.objects.order_by('-pub_date', '-id')
+        limit = options['limit']
+
+        def read():
+            return RecipeReadSerializer(
+                recipes.select_related('author').prefetch_related(
+                    'tags', 'recipes__ingredient'
+                )[:limit],
+                many=True,
+                context=context
+            ).data
+
+        def fast():
+            return RecipeFastReadSerializer(
+                get_recipe_rows(recipes[:limit]),
+                many=True,
+                context=context
+            ).data
+
+        expected = normalize(read())
+        actual = normalize(fast())
+        mismatches = [
+            reference['id']
+            for reference, result in zip(expected, actual)
+            if reference != result
+        ]
+        if len(expected) != len(actual) or mismatches:
+            raise CommandError(
+                f'Вывод сериализаторов расходится, рецепты: {mismatches}.'
+            )
+        self.stdout.write(f'Вывод совпадает, рецептов: {len(expected)}.')
+        if not expected:
+            return
+        for name, serialize in (
+            ('RecipeReadSerializer', read),
+            ('RecipeFastReadSerializer', fast),
+        ):
+            best = min(
+                self.measure(serialize) for _ in range(options['repeat'])
+            )
+            self.stdout.write(
+                f'{name}: {len(expected) / best:.0f} рецептов/с '
+                f'({best * 1000:.1f} мс)'
+            )
+
+    @staticmethod
+    def measure(serialize):
+        start = time.perf_counter()
+        serialize()
+        return time.perf_counter() - start
@@ -0,0 +1,109 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def read_memory(pid):
+    """Возвращает Rss, Pss и Private (КиБ) процесса из smaps_rollup."""
+    memory = {'Rss': 0, 'Pss': 0, 'Private': 0}
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                memory[key] = int(value.split()[0])
+            elif key in ('Private_Clean', 'Private_Dirty'):
+                memory['Private'] += int(value.split()[0])
+    return memory
+
+
+def get_children(pid):
+    children = Path(f'/proc/{pid}/task/{pid}/children').read_text()
+    return [int(child) for child in children.split()]
+
+
+class Command(BaseCommand):
+    """
+    Замер времени запуска gunicorn и памяти на воркер
+    с preload_app и без него для выбранного класса воркеров.
+    Сервер запускается с конфигурацией gunicorn.conf.py, время запуска
+    считается до первого успешного ответа GET /api/tags/ после появления
+    всех воркеров, память читается из /proc/<pid>/smaps_rollup (только Linux).
+    """
+    help = 'Сравнивает запуск и память gunicorn с preload_app и без.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--worker-class',
+            choices=('sync', 'gthread', 'uvicorn'),
+            default='gthread'
+        )
+        parser.add_argument('--bind', default='127.0.0.1:9099')
+        parser.add_argument('--warmup-requests', type=int, default=50)
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        for preload in ('False', 'True'):
+            self.run_server(preload, options)
+
+    def run_server(self, preload, options):
+        env = {
+            **os.environ,
+            'GUNICORN_PRELOAD': preload,
+            'GUNICORN_WORKERS': str(options['workers']),
+            'GUNICORN_WORKER_CLASS': options['worker_class'],
+            'GUNICORN_BIND': options['bind'],
+        }
+        url = f'http://{options["bind"]}/api/tags/'
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            startup = self.wait_for_workers(server, url, options, started)
+            for _ in range(options['warmup_requests']):
+                requests.get(url, timeout=10)
+            workers = [
+                read_memory(pid) for pid in get_children(server.pid)
+            ]
+            master = read_memory(server.pid)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=options['timeout'])
+        count = len(workers)
+        self.stdout.write(
+            f'preload={preload}: запуск {startup:.2f} s, '
+            f'воркеров {count}, '
+            f'Pss/воркер {sum(w["Pss"] for w in workers) / count:.0f} KiB, '
+            f'Private/воркер '
+            f'{sum(w["Private"] for w in workers) / count:.0f} KiB, '
+            f'Rss/воркер {sum(w["Rss"] for w in workers) / count:.0f} KiB, '
+            f'Pss всего {master["Pss"] + sum(w["Pss"] for w in workers)} KiB'
+        )
+
+    @staticmethod
+    def wait_for_workers(server, url, options, started):
+        deadline = started + options['timeout']
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise CommandError('gunicorn завершился при запуске.')
+            ready = len(get_children(server.pid)) >= options['workers']
+            try:
+                if ready and requests.get(url, timeout=1).ok:
+                    return time.perf_counter() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.05)
+        raise CommandError('gunicorn не запустился за отведенное время.')
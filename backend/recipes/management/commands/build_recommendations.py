@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.recommendations import build_recommendations
+from foodgram.constants import RECOMMENDATIONS_NEIGHBORS
+
+
+class Command(BaseCommand):
+    """
+    Пересборка item-item модели рекомендаций (RecipeNeighbors)
+    по избранному и спискам покупок. Запускается периодически,
+    например из cron: рекомендации отражают данные на момент сборки.
+    """
+    help = 'Пересобирает соседей рецептов для рекомендаций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--neighbors', type=int, default=RECOMMENDATIONS_NEIGHBORS
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        created = build_recommendations(
+            options['neighbors'], options['batch_size']
+        )
+        self.stdout.write(
+            f'Рецептов с соседями сохранено: {created} '
+            f'за {time.perf_counter() - start:.1f} с.'
+        )
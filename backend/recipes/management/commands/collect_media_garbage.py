@@ -0,0 +1,61 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+
+def walk(storage, directory):
+    """Все файлы каталога хранилища, включая вложенные каталоги."""
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for name in directories:
+        yield from walk(storage, os.path.join(directory, name))
+
+
+class Command(BaseCommand):
+    """
+    Удаление картинок рецептов, на которые не ссылается ни один рецепт:
+    замененных картинок и картинок удаленных рецептов. Файлы моложе
+    --min-age секунд не трогаются: рецепт с только что сохраненной
+    картинкой мог еще не попасть в БД.
+    """
+    help = 'Удаляет картинки рецептов, не используемые рецептами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=3600)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        storage = field.storage
+        directory = field.upload_to.strip('/')
+        if not storage.exists(directory):
+            self.stdout.write('Картинок нет.')
+            return
+        used = set(
+            Recipe.objects.exclude(image='').values_list(
+                'image',
+                flat=True
+            ).iterator()
+        )
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+        removed = removed_size = 0
+        for name in walk(storage, directory):
+            if (
+                name in used
+                or storage.get_modified_time(name) > cutoff
+                or Recipe.objects.filter(image=name).exists()
+            ):
+                continue
+            removed += 1
+            removed_size += storage.size(name)
+            if not options['dry_run']:
+                storage.delete(name)
+        self.stdout.write(
+            f'{"Будет удалено" if options["dry_run"] else "Удалено"} '
+            f'файлов: {removed}, {removed_size // 1024} КБ.'
+        )
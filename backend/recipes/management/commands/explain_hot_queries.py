@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+HOT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?tags={tag}',
+    '/api/recipes/?author={author}',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/?ingredients={ingredient}',
+    '/api/recipes/{recipe}/',
+    '/api/recipes/feed/',
+    '/api/recipes/shopping_list/',
+    '/api/ingredients/?name={ingredient_prefix}',
+    '/api/tags/',
+    '/api/users/',
+    '/api/users/subscriptions/',
+)
+
+
+class Command(BaseCommand):
+    """
+    EXPLAIN ANALYZE основных запросов вьюсетов на данных текущей БД.
+    Каждый путь из HOT_PATHS выполняется от имени --user, запросы
+    перехватываются, и для --top самых долгих из них выводится план.
+    Запускать на БД с тестовыми данными, сопоставимыми с боевыми.
+    """
+    help = 'Выводит планы самых долгих запросов основных эндпоинтов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=None)
+        parser.add_argument('--paths', nargs='+', default=HOT_PATHS)
+        parser.add_argument('--top', type=int, default=1)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN ANALYZE поддерживается на PostgreSQL.')
+        user = self.get_user(options['user'])
+        params = self.get_path_params()
+        factory = APIRequestFactory(SERVER_NAME=self.get_host())
+        for template in options['paths']:
+            if any(
+                value is None and f'{{{key}}}' in template
+                for key, value in params.items()
+            ):
+                self.stdout.write(f'{template}: нет данных, пропущен')
+                continue
+            path = template.format(**params)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.call_view(factory, path, user)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{path}: {response.status_code}, '
+                f'запросов {len(queries.captured_queries)}'
+            ))
+            slowest = sorted(
+                (
+                    query for query in queries.captured_queries
+                    if query['sql'].lstrip().upper().startswith('SELECT')
+                ),
+                key=lambda query: float(query['time']),
+                reverse=True
+            )[:options['top']]
+            for query in slowest:
+                self.stdout.write(query['sql'])
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'EXPLAIN (ANALYZE, BUFFERS) ' + query['sql']
+                    )
+                    for row in cursor.fetchall():
+                        self.stdout.write(f'    {row[0]}')
+
+    @staticmethod
+    def get_user(user_id):
+        users = User.objects.order_by('pk')
+        user = (
+            users.filter(pk=user_id) if user_id else
+            users.filter(follower_subscriptions__isnull=False)
+        ).first() or users.first()
+        if user is None:
+            raise CommandError('В БД нет пользователей.')
+        return user
+
+    @staticmethod
+    def get_path_params():
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        tag = Tag.objects.order_by('pk').first()
+        ingredient = Ingredient.objects.order_by('pk').first()
+        return {
+            'recipe': recipe and recipe.pk,
+            'author': recipe and recipe.author_id,
+            'tag': tag and tag.slug,
+            'ingredient': ingredient and ingredient.pk,
+            'ingredient_prefix': ingredient and ingredient.name[:2],
+        }
+
+    @staticmethod
+    def get_host():
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+        return hosts[0].lstrip('.') if hosts else 'localhost'
+
+    @staticmethod
+    def call_view(factory, path, user):
+        request = factory.get(path)
+        force_authenticate(request, user=user)
+        match = resolve(path.split('?')[0])
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
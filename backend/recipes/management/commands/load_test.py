@@ -0,0 +1,94 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/{recipe_id}/',
+    '/api/ingredients/?name=мо',
+    '/api/tags/',
+)
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест эндпоинтов чтения на запущенном сервере.
+    Для каждого уровня параллельности клиенты в течение --duration секунд
+    по кругу запрашивают --paths, после чего выводятся req/s и задержки.
+    Сравнение WSGI и ASGI выполняется запуском команды против
+    gunicorn (foodgram.wsgi) и uvicorn (foodgram.asgi) с одинаковым
+    количеством воркеров.
+    """
+    help = 'Замеряет масштабирование эндпоинтов чтения по параллельности.'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:9090')
+        parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+        parser.add_argument('--recipe-id', type=int, default=1)
+        parser.add_argument(
+            '--concurrency',
+            nargs='+',
+            type=int,
+            default=(1, 8, 32, 64)
+        )
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--token', default=None)
+
+    def handle(self, *args, **options):
+        urls = [
+            options['base_url'] + path.format(recipe_id=options['recipe_id'])
+            for path in options['paths']
+        ]
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        for concurrency in options['concurrency']:
+            deadline = time.perf_counter() + options['duration']
+            with ThreadPoolExecutor(concurrency) as executor:
+                results = list(executor.map(
+                    lambda offset: self.run_client(
+                        urls, headers, deadline, offset
+                    ),
+                    range(concurrency)
+                ))
+            latencies = [
+                latency for client in results for latency in client[0]
+            ]
+            errors = sum(client[1] for client in results)
+            if not latencies:
+                self.stdout.write(f'c={concurrency}: нет ответов')
+                continue
+            latencies.sort()
+            self.stdout.write(
+                f'c={concurrency}: '
+                f'{len(latencies) / options["duration"]:.1f} req/s, '
+                f'p50 {statistics.median(latencies) * 1000:.1f} ms, '
+                f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, '
+                f'ошибок: {errors}'
+            )
+
+    @staticmethod
+    def run_client(urls, headers, deadline, offset):
+        latencies = []
+        errors = 0
+        session = requests.Session()
+        index = offset
+        while time.perf_counter() < deadline:
+            url = urls[index % len(urls)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                response = session.get(url, headers=headers, timeout=30)
+            except requests.RequestException:
+                errors += 1
+                continue
+            if response.status_code >= 400:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+        session.close()
+        return latencies, errors
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.feed import rebuild_feeds
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Пересборка лент подписок (FeedEntry) по текущим подпискам.
+    Нужна при включении FEED_FANOUT_ENABLED, чтобы заполнить ленты
+    рецептами, опубликованными раньше.
+    """
+    help = 'Пересобирает ленты подписок пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        if not settings.FEED_FANOUT_ENABLED:
+            raise CommandError('Ленты не используются: FEED_FANOUT_ENABLED.')
+        user_ids = options['users']
+        if user_ids is None:
+            user_ids = list(
+                User.objects.filter(
+                    follower_subscriptions__isnull=False
+                ).distinct().order_by('pk').values_list('pk', flat=True)
+            )
+        batch_size = options['batch_size']
+        for start in range(0, len(user_ids), batch_size):
+            rebuild_feeds(user_ids[start:start + batch_size])
+        self.stdout.write(f'Лент пересобрано: {len(user_ids)}.')
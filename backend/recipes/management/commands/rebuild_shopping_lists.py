@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.shopping_list import get_shopping_list_totals, refresh_shopping_lists
+from recipes.models import ShoppingListItem
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Сверка и пересборка материализованного списка покупок.
+    С --check позиции только сравниваются с суммами, посчитанными
+    по спискам покупок и ингредиентам рецептов, и при расхождениях
+    команда завершается с ошибкой. Без --check списки пересобираются
+    пачками по --batch-size пользователей.
+    """
+    help = 'Проверяет или пересобирает материализованные списки покупок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', type=int, default=None)
+        parser.add_argument('--check', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_lists(options['users'])
+        else:
+            self.rebuild_lists(options['users'], options['batch_size'])
+
+    def check_lists(self, user_ids):
+        expected = get_shopping_list_totals(user_ids)
+        items = ShoppingListItem.objects.all()
+        if user_ids is not None:
+            items = items.filter(user_id__in=user_ids)
+        actual = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in items.values_list(
+                'user_id', 'ingredient_id', 'total'
+            ).iterator()
+        }
+        mismatches = sorted(
+            key for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        )
+        for user_id, ingredient_id in mismatches:
+            self.stdout.write(
+                f'пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'ожидается {expected.get((user_id, ingredient_id))}, '
+                f'в списке {actual.get((user_id, ingredient_id))}'
+            )
+        if mismatches:
+            raise CommandError(f'Расхождений: {len(mismatches)}.')
+        self.stdout.write(
+            f'Позиций проверено: {len(expected)}, все совпадают.'
+        )
+
+    def rebuild_lists(self, user_ids, batch_size):
+        if user_ids is None:
+            user_ids = list(
+                User.objects.order_by('pk').values_list('pk', flat=True)
+            )
+        for start in range(0, len(user_ids), batch_size):
+            refresh_shopping_lists(user_ids[start:start + batch_size])
+        self.stdout.write(f'Списки покупок пересобраны: {len(user_ids)}.')
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.similar import update_similarity_buckets
+from recipes.models import Recipe, SimilarityBucket
+
+
+class Command(BaseCommand):
+    """
+    Пересборка LSH-корзин похожих рецептов (SimilarityBucket).
+    Нужна после миграции и массовой загрузки рецептов в обход ORM:
+    дальше корзины пересчитываются сигналами при изменении ингредиентов.
+    """
+    help = 'Пересобирает корзины похожих рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', nargs='+', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        recipe_ids = options['recipes']
+        replace = recipe_ids is not None
+        if not replace:
+            SimilarityBucket.objects.all().delete()
+            recipe_ids = list(
+                Recipe.objects.order_by('pk').values_list('pk', flat=True)
+            )
+        batch_size = options['batch_size']
+        for offset in range(0, len(recipe_ids), batch_size):
+            update_similarity_buckets(
+                recipe_ids[offset:offset + batch_size], replace=replace
+            )
+        self.stdout.write(
+            f'Рецептов пересчитано: {len(recipe_ids)} '
+            f'за {time.perf_counter() - start:.1f} с.'
+        )
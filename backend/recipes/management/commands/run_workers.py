@@ -0,0 +1,121 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.shopping_list_jobs import (
+    delete_expired_shopping_list_jobs,
+    run_shopping_list_jobs
+)
+from foodgram.constants import (
+    SHOPPING_LIST_JOB_CLEANUP_INTERVAL,
+    SHOPPING_LIST_JOB_TTL
+)
+
+
+def work(stop, poll_interval, once):
+    """Цикл воркера: выполняет задания и ждет новых, пока не остановлен."""
+    while not stop.is_set():
+        if not run_shopping_list_jobs() and once:
+            break
+        stop.wait(poll_interval)
+    connections.close_all()
+
+
+def clean(stop, interval, ttl):
+    """Удаляет устаревшие задания и их файлы раз в interval секунд."""
+    while not stop.is_set():
+        delete_expired_shopping_list_jobs(ttl)
+        connections.close_all()
+        stop.wait(interval)
+
+
+def work_in_process(stop, poll_interval, once):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(stop, poll_interval, once)
+
+
+class Command(BaseCommand):
+    """
+    Воркеры очереди заданий на формирование PDF со списками покупок.
+    Очередь хранится в таблице ShoppingListJob, внешний брокер не нужен.
+    Воркеры запускаются потоками или процессами (--mode), с --once
+    команда выполняет накопившиеся задания и завершается.
+    Завершенные задания старше --job-ttl секунд удаляются вместе с PDF:
+    отдельным потоком раз в --cleanup-interval секунд, с --once - один
+    раз перед запуском воркеров.
+    """
+    help = 'Запускает воркеры очереди заданий на списки покупок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--mode',
+            choices=('thread', 'process'),
+            default='thread'
+        )
+        parser.add_argument('--poll-interval', type=float, default=1)
+        parser.add_argument('--once', action='store_true')
+        parser.add_argument(
+            '--job-ttl',
+            type=int,
+            default=SHOPPING_LIST_JOB_TTL
+        )
+        parser.add_argument(
+            '--cleanup-interval',
+            type=float,
+            default=SHOPPING_LIST_JOB_CLEANUP_INTERVAL
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            delete_expired_shopping_list_jobs(options['job_ttl'])
+        if options['mode'] == 'process':
+            # Соединения с БД нельзя разделять между процессами.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            workers = [
+                context.Process(
+                    target=work_in_process,
+                    args=(stop, options['poll_interval'], options['once'])
+                )
+                for _ in range(options['workers'])
+            ]
+        else:
+            stop = threading.Event()
+            workers = [
+                threading.Thread(
+                    target=work,
+                    args=(stop, options['poll_interval'], options['once'])
+                )
+                for _ in range(options['workers'])
+            ]
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            f'Запущено воркеров: {len(workers)} ({options["mode"]}).'
+        )
+        # Поток очистки стартует после fork, в процессе команды.
+        if not options['once']:
+            cleaner = threading.Thread(
+                target=clean,
+                args=(
+                    stop,
+                    options['cleanup_interval'],
+                    options['job_ttl']
+                )
+            )
+            cleaner.start()
+            workers.append(cleaner)
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write('Воркеры остановлены.')
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-19 07:55
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_trigram_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1, message='Количество порций должно быть не меньше одной.')], verbose_name='Количество порций'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-19 08:23
+
+from django.db import migrations, models
+import foodgram.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(default=None, storage=foodgram.storage.ContentHashStorage(), upload_to='recipes/', verbose_name='Картинка'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-19 08:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_similaritybucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeNeighbors',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='neighbors', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('neighbor_ids', models.BinaryField(verbose_name='Id соседних рецептов')),
+                ('scores', models.BinaryField(verbose_name='Косинусные близости соседей')),
+            ],
+            options={
+                'verbose_name': 'Соседи рецепта',
+                'verbose_name_plural': 'Соседи рецептов',
+            },
+        ),
+    ]
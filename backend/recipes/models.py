@@ -1,25 +1,40 @@
+import uuid
+
 from colorfield.fields import ColorField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
 
 from foodgram.constants import (
     CHOICES_COLOR,
     DEFAULT_COLOR,
+    LENGTH_FOR_JOB_STATUS,
     LENGTH_FOR_MEASUREMENT_UNIT,
     LENGTH_FOR_NAME,
     LENGTH_FOR_TAG_NAME_SLUG,
     LENGTH_FOR_TEXT
 )
 from foodgram.settings import AUTH_USER_MODEL
+from foodgram.storage import ContentHashStorage
+
+SEARCH_CONFIG = 'russian'
+
+RECIPE_SEARCH_VECTOR = (
+    SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+)
 
 
 class BaseModel(models.Model):
     """Базовая модель для моделей избранного и списка покупок."""
+    # Поиск по пользователю идет по ограничению (user, recipe).
     user = models.ForeignKey(
         AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='%(class)s_user',
+        db_index=False,
         verbose_name='Пользователь',
     )
     recipe = models.ForeignKey(
@@ -55,6 +70,7 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/',
+        storage=ContentHashStorage(),
         default=None,
         verbose_name='Картинка',
     )
@@ -63,6 +79,11 @@ class Recipe(models.Model):
         verbose_name='Дата публикации рецепта',
         db_index=True,
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения рецепта',
+    )
     author = models.ForeignKey(
         AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -78,9 +99,14 @@ class Recipe(models.Model):
         through_fields=('recipe', 'ingredient'),
         verbose_name='Ингредиенты',
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+    )
 
     class Meta:
-        ordering = ('-pub_date', 'name', 'author',)
+        ordering = ('-pub_date', 'name', 'author_id',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         default_related_name = 'recipes'
@@ -90,10 +116,36 @@ class Recipe(models.Model):
                 name='unique_recipe_name_author'
             )
         ]
+        indexes = [
+            GinIndex(
+                fields=('search_vector',),
+                name='recipe_search_vector_idx'
+            ),
+            GinIndex(
+                fields=('name',),
+                name='recipe_name_trgm_idx',
+                opclasses=('gin_trgm_ops',)
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет рецепт и обновляет поисковый вектор
+        (название с весом A, описание с весом B) на PostgreSQL.
+        """
+        super().save(*args, **kwargs)
+        if connections[self._state.db].vendor == 'postgresql':
+            Recipe.objects.using(self._state.db).filter(pk=self.pk).update(
+                search_vector=RECIPE_SEARCH_VECTOR
+            )
+
 
 class Tag(models.Model):
     """
@@ -120,6 +172,10 @@ class Tag(models.Model):
         unique=True,
         verbose_name='Слаг тега',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения тега',
+    )
 
     class Meta:
         ordering = ('name',)
@@ -140,6 +196,10 @@ class Ingredient(models.Model):
         max_length=LENGTH_FOR_MEASUREMENT_UNIT,
         verbose_name='Единицы измерения',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения ингредиента',
+    )
 
     class Meta:
         ordering = ('name',)
@@ -151,6 +211,13 @@ class Ingredient(models.Model):
                 name='unique_ingredient_name_measurement_unit'
             )
         ]
+        indexes = [
+            GinIndex(
+                fields=('name',),
+                name='ingredient_name_trgm_idx',
+                opclasses=('gin_trgm_ops',)
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -167,16 +234,19 @@ class RecipeIngredient(models.Model):
         ],
         verbose_name='Количество ингредиентов',
     )
+    # Индексы по ингредиенту и рецепту - составные (см. Meta).
     ingredient = models.ForeignKey(
         'Ingredient',
         on_delete=models.CASCADE,
         related_name='ingredients',
+        db_index=False,
         verbose_name='Ингредиент',
     )
     recipe = models.ForeignKey(
         'Recipe',
         on_delete=models.CASCADE,
         related_name='recipes',
+        db_index=False,
         verbose_name='Рецепт'
     )
 
@@ -189,6 +259,13 @@ class RecipeIngredient(models.Model):
                 name='unique_ingredients_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'ingredient'),
+                name='recipeingredient_recipe_idx',
+                include=('amount',)
+            ),
+        ]
 
     def __str__(self):
         return f'{self.ingredient} в {self.recipe}.'
@@ -212,6 +289,17 @@ class Favorite(BaseModel):
 
 class ShoppingCart(BaseModel):
     "Модель списка покупок."
+    servings = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[
+            MinValueValidator(
+                1,
+                message='Количество порций должно быть не меньше одной.'
+            ),
+        ],
+        verbose_name='Количество порций',
+    )
+
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
@@ -226,18 +314,236 @@ class ShoppingCart(BaseModel):
         return f'{self.recipe} в списке покупок у пользователя {self.user}.'
 
 
+class ShoppingListItem(models.Model):
+    """
+    Материализованный список покупок: суммарное количество ингредиента
+    по всем рецептам в списке покупок пользователя с учетом порций.
+    Поддерживается сигналами при изменении списка покупок и ингредиентов
+    рецептов, пересобирается командой rebuild_shopping_lists.
+    """
+    # Поиск по пользователю идет по ограничению (user, ingredient).
+    user = models.ForeignKey(
+        AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        db_index=False,
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        'Ingredient',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    total = models.PositiveIntegerField(
+        verbose_name='Общее количество',
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_user_ingredient'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.total} у пользователя {self.user}.'
+
+
+def shopping_list_upload_to(instance, filename):
+    return f'shopping_lists/{uuid.uuid4()}.pdf'
+
+
+class ShoppingListJob(models.Model):
+    """
+    Задание на формирование PDF со списком покупок.
+    Задания выбираются из таблицы командой run_workers.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user = models.ForeignKey(
+        AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_jobs',
+        verbose_name='Пользователь',
+    )
+    status = models.CharField(
+        max_length=LENGTH_FOR_JOB_STATUS,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Статус',
+    )
+    file = models.FileField(
+        upload_to=shopping_list_upload_to,
+        blank=True,
+        verbose_name='Файл',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания',
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата начала',
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата завершения',
+    )
+
+    class Meta:
+        ordering = ('-created_at',)
+        verbose_name = 'Задание на список покупок'
+        verbose_name_plural = 'Задания на списки покупок'
+        indexes = [
+            models.Index(
+                fields=('status', 'created_at'),
+                name='shoppinglistjob_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'Задание {self.pk} пользователя {self.user}: {self.status}.'
+
+
+class FeedEntry(models.Model):
+    """
+    Лента пользователя, заполняемая при публикации рецепта
+    (fan-out on write): по записи на каждого подписчика автора.
+    Дата публикации копируется из рецепта, чтобы лента читалась
+    по одному индексу. Используется при FEED_FANOUT_ENABLED.
+    """
+    # Поиск по пользователю идет по индексу (user, pub_date, recipe).
+    user = models.ForeignKey(
+        AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        db_index=False,
+        verbose_name='Пользователь',
+    )
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_user_recipe'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feedentry_user_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте пользователя {self.user}.'
+
+
+class SimilarityBucket(models.Model):
+    """
+    LSH-корзина рецепта: хэш одной полосы MinHash-сигнатуры
+    набора его ингредиентов. Рецепты с общей корзиной - кандидаты
+    в похожие, точная похожесть считается только для них.
+    """
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='similarity_buckets',
+        verbose_name='Рецепт',
+    )
+    bucket = models.BigIntegerField(
+        verbose_name='Корзина',
+    )
+
+    class Meta:
+        verbose_name = 'Корзина похожих рецептов'
+        verbose_name_plural = 'Корзины похожих рецептов'
+        indexes = [
+            models.Index(
+                fields=('bucket', 'recipe'),
+                name='similaritybucket_bucket_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в корзине {self.bucket}.'
+
+
+class RecipeNeighbors(models.Model):
+    """
+    Соседи рецепта в item-item модели рекомендаций: рецепты, которые
+    чаще всего добавляют в избранное и покупки те же пользователи.
+    Top-k соседей хранится одной строкой на рецепт: id соседей
+    и близости упакованы массивами NumPy (int64 и float32).
+    Таблица пересобирается командой build_recommendations.
+    """
+    recipe = models.OneToOneField(
+        'Recipe',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='neighbors',
+        verbose_name='Рецепт',
+    )
+    neighbor_ids = models.BinaryField(
+        verbose_name='Id соседних рецептов',
+    )
+    scores = models.BinaryField(
+        verbose_name='Косинусные близости соседей',
+    )
+
+    class Meta:
+        verbose_name = 'Соседи рецепта'
+        verbose_name_plural = 'Соседи рецептов'
+
+    def __str__(self):
+        return f'Соседи рецепта {self.recipe}.'
+
+
 class Subscriptions(models.Model):
     "Модель подписок."
+    # Индексы по обеим сторонам подписки - составные (см. Meta).
     follower = models.ForeignKey(
         AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='follower_subscriptions',
+        db_index=False,
         verbose_name='Пользователь, который подписывается на других',
     )
     following = models.ForeignKey(
         AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='following_subscriptions',
+        db_index=False,
         verbose_name='Пользователь, на которого подписаны',
     )
 
@@ -250,6 +556,12 @@ class Subscriptions(models.Model):
                 name='unique_follower_following'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('following', 'follower'),
+                name='subscriptions_following_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.follower} подписан на пользователя {self.following}.'
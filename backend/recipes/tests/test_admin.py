@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.utils import (
+    create_ingredient,
+    create_recipe,
+    create_tag,
+    create_user
+)
+from recipes.models import Favorite
+
+RECIPES_COUNT = 5
+
+
+class RecipeAdminQueriesTests(TestCase):
+    """
+    Число запросов страниц рецептов в админке не зависит
+    от числа рецептов, ингредиентов и добавлений в избранное.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        author = create_user('chef')
+        tag = create_tag('soup')
+        ingredients = [
+            create_ingredient(name) for name in ('salt', 'beet', 'flour')
+        ]
+        cls.recipes = [
+            create_recipe(author, f'Рецепт {index}', ingredients, [tag])
+            for index in range(RECIPES_COUNT)
+        ]
+        Favorite.objects.bulk_create(
+            Favorite(user=user, recipe=recipe)
+            for user in (cls.admin, author)
+            for recipe in cls.recipes
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist(self):
+        with self.assertNumQueries(6):
+            response = self.client.get('/admin/recipes/recipe/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Рецепт 0')
+
+    def test_change_form(self):
+        with self.assertNumQueries(10):
+            response = self.client.get(
+                f'/admin/recipes/recipe/{self.recipes[0].pk}/change/'
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_changelist_uses_estimated_count(self):
+        # Порог больших таблиц снижен до нуля, чтобы оценка из
+        # pg_class.reltuples использовалась и на тестовых данных.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE recipes_recipe')
+        with mock.patch('recipes.admin.ADMIN_ESTIMATED_COUNT_MIN', 0):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/admin/recipes/recipe/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, RECIPES_COUNT)
+        self.assertFalse([
+            query['sql'] for query in queries
+            if 'COUNT(*)' in query['sql']
+            and 'recipes_recipe' in query['sql']
+        ])
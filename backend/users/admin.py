@@ -9,4 +9,4 @@ class UserAdmin(UserAdmin):
     """Кастомный класс для регистрации модели пользователей в админке."""
     list_display = ('username', 'email',)
     search_fields = ('email', 'username',)
-    list_filter = ('email', 'username',)
+    list_filter = ('is_staff', 'is_active',)
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-19 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='primary_pinned_until',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Чтение из основной БД до'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
+from django.utils import timezone
 
 from foodgram.constants import LENGTH_FOR_EMAIL, LENGTH_FOR_USERNAME
 from .validators import validate_username_me
@@ -26,6 +27,26 @@ class User(AbstractUser):
         unique=True,
         verbose_name='Адрес электронной почты'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения',
+    )
+    # Меняется при изменении избранного, списка покупок и подписок
+    # пользователя: версия его флагов в api.user_flags и часть ETag.
+    flags_updated_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name='Дата изменения избранного, покупок и подписок',
+    )
+
+    # До этого момента чтения пользователя идут в основную БД, а не
+    # в реплику: закрепление после записи для клиентов без cookie.
+    primary_pinned_until = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name='Чтение из основной БД до',
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [